@@ -0,0 +1,124 @@
+# admission.py: Контроль допуску запитів до ігрового API.
+# - глобальний ліміт одночасних запитів зі швидкою відмовою (503);
+# - окрема "смуга" для вебхука Telegram, яку ігрове навантаження не займає;
+# - окрема смуга для довгоживучих SSE-з'єднань (/live), щоб вони не займали ліміт API;
+# - відра токенів на кожного user_id (429);
+# - окремий пул потоків для роботи з БД, щоб синхронний SQLite не блокував event loop.
+
+import logging
+import math
+
+from anyio import CapacityLimiter, to_thread
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from config import (
+    BOT_TOKEN, API_MAX_CONCURRENCY, WEBHOOK_MAX_CONCURRENCY, API_DB_THREADS, LIVE_MAX_CONNECTIONS,
+    SAVE_STATS_RATE, SAVE_STATS_BURST, SKIN_ACTION_RATE, SKIN_ACTION_BURST,
+)
+from rate_limit import KeyedTokenBuckets
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = f"/{BOT_TOKEN}"
+LIVE_PREFIX = "/live/"
+
+# Шляхи, які не потребують контролю: статика та сторінка гри
+UNLIMITED_PREFIXES = ("/static", "/game", "/docs", "/openapi.json")
+
+# Відра токенів на користувача, окремо для кожного типу дії
+save_stats_buckets = KeyedTokenBuckets(SAVE_STATS_RATE, capacity=SAVE_STATS_BURST)
+skin_action_buckets = KeyedTokenBuckets(SKIN_ACTION_RATE, capacity=SKIN_ACTION_BURST)
+
+# Потоки для БД ігрового API; вебхук бота ними не користується
+_db_limiter = None
+
+
+def _get_db_limiter() -> CapacityLimiter:
+    """CapacityLimiter має створюватися всередині event loop."""
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = CapacityLimiter(API_DB_THREADS)
+    return _db_limiter
+
+
+async def run_db(func, *args, **kwargs):
+    """Виконує синхронний виклик БД в окремому потоці ігрового пулу."""
+    return await to_thread.run_sync(lambda: func(*args, **kwargs), limiter=_get_db_limiter())
+
+
+def _too_many_requests(wait: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Забагато запитів. Спробуйте трохи пізніше.",
+        headers={"Retry-After": str(math.ceil(wait))}
+    )
+
+
+def enforce_user_rate(buckets: KeyedTokenBuckets, user_id: int, tokens: float = 1.0):
+    """Кидає 429, якщо користувач вичерпав свій ліміт запитів."""
+    wait = buckets.try_acquire(user_id, tokens)
+    if wait > 0:
+        raise _too_many_requests(wait)
+
+
+def enforce_users_rate(buckets: KeyedTokenBuckets, tokens_by_user: dict):
+    """
+    Те саме для кількох користувачів одного запиту: токени списуються або в усіх, або в жодного.
+    Якщо ліміт вичерпав не перший користувач, уже забрані токени повертаються.
+    """
+    taken = []
+    for user_id, tokens in tokens_by_user.items():
+        wait = buckets.try_acquire(user_id, tokens)
+        if wait > 0:
+            for taken_user_id, taken_tokens in taken:
+                buckets.refund(taken_user_id, taken_tokens)
+            raise _too_many_requests(wait)
+        taken.append((user_id, tokens))
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware, що рахує запити в обробці для кожної смуги
+    і одразу відхиляє нові, якщо смуга заповнена.
+    """
+    def __init__(self, app, api_limit: int = API_MAX_CONCURRENCY, webhook_limit: int = WEBHOOK_MAX_CONCURRENCY,
+                 live_limit: int = LIVE_MAX_CONNECTIONS):
+        self.app = app
+        self.limits = {"api": api_limit, "webhook": webhook_limit, "live": live_limit}
+        self.in_flight = {"api": 0, "webhook": 0, "live": 0}
+
+    def _lane(self, path: str):
+        if path == WEBHOOK_PATH:
+            return "webhook"
+        if path.startswith(LIVE_PREFIX):
+            return "live"
+        if path == "/" or path.startswith(UNLIMITED_PREFIXES):
+            return None
+        return "api"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        lane = self._lane(scope["path"])
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight[lane] >= self.limits[lane]:
+            logger.warning(f"Перевантаження смуги {lane}: {self.in_flight[lane]} запитів в обробці, запит відхилено.")
+            response = JSONResponse(
+                {"detail": "Сервер перевантажений, спробуйте за мить."},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight[lane] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[lane] -= 1
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import hmac
 import logging
+from collections import Counter
+from typing import Optional
 
+from admission import enforce_user_rate, enforce_users_rate, run_db, save_stats_buckets, skin_action_buckets
+from config import EXPORT_TOKEN, SAVE_STATS_BURST, TELEMETRY_MAX_BYTES
 from database import db
-from models import GameStats, SkinAction # ОНОВЛЕНО: Додано SkinAction
+from export import EXPORT_TABLES, parse_cursor, stream_export
+from live import live_hub
+from models import GameStats, GameStatsBatch, SkinAction # ОНОВЛЕНО: Додано SkinAction
+from notifier import notifier
+from telemetry import TelemetryError, TelemetryStore, check_plausibility, decode_session
 
 # Налаштування логера
 logging.basicConfig(level=logging.INFO)
@@ -11,33 +21,100 @@ logger = logging.getLogger(__name__)
 # Створення роутера
 router = APIRouter()
 
+# Сховище телеметрії створюється при першому пакеті, коли db вже налаштовано
+_telemetry_store = None
+
+def _get_telemetry_store():
+    global _telemetry_store
+    if _telemetry_store is None and db.db_path:
+        _telemetry_store = TelemetryStore(db.db_path)
+    return _telemetry_store
+
+def _save_stats(stats: GameStats):
+    """Синхронна частина збереження статистики; виконується в потоці ігрового пулу."""
+    # Старий рекорд потрібен, щоб сповістити гравців, яких щойно обійшли
+    previous_stats = db.get_user_stats(stats.user_id)
+    old_height = previous_stats['max_height'] if previous_stats else 0
+
+    # Спочатку переконуємось, що користувач існує, або створюємо/оновлюємо його
+    db.save_or_update_user(stats.user_id, stats.username, stats.first_name)
+    
+    # Зберігаємо результат гри
+    db.save_game_result(
+        user_id=stats.user_id,
+        score=stats.score,
+        collected_beans=stats.collected_beans
+    )
+    
+    # Повертаємо оновлену статистику, щоб гра могла її відобразити
+    updated_stats = db.get_user_stats(stats.user_id)
+
+    if stats.score > old_height:
+        notifier.notify_record_beaten(stats.user_id, stats.username or stats.first_name, old_height, stats.score)
+
+    return updated_stats
+
 @router.post("/save_stats")
 async def save_stats_endpoint(stats: GameStats):
     """Ендпоінт для збереження статистики гри (ОНОВЛЕНО: приймає username/first_name)."""
+    enforce_user_rate(save_stats_buckets, stats.user_id)
     try:
-        # Спочатку переконуємось, що користувач існує, або створюємо/оновлюємо його
-        db.save_or_update_user(stats.user_id, stats.username, stats.first_name)
-        
-        # Зберігаємо результат гри
-        db.save_game_result(
-            user_id=stats.user_id,
-            score=stats.score,
-            collected_beans=stats.collected_beans
-        )
-        
-        # Повертаємо оновлену статистику, щоб гра могла її відобразити
-        updated_stats = db.get_user_stats(stats.user_id)
-        
+        updated_stats = await run_db(_save_stats, stats)
+        live_hub.notify_score(stats.user_id, stats.score)
         return {"success": True, "message": "Статистику успішно збережено", "stats": updated_stats}
     except Exception as e:
         logger.error(f"Помилка збереження статистики для user {stats.user_id}: {e}")
         raise HTTPException(status_code=500, detail="Внутрішня помилка сервера при збереженні статистики.")
 
+def _save_stats_batch(batch: GameStatsBatch):
+    """Синхронна частина пакетного збереження; виконується в потоці ігрового пулу."""
+    result = db.save_game_results_batch(batch.results)
+    if result is None:
+        raise RuntimeError("Пакет не збережено")
+    for record in result["records"]:
+        notifier.notify_record_beaten(record["user_id"], record["name"], record["old_height"], record["new_height"])
+    return result
+
+@router.post("/save_stats_batch")
+async def save_stats_batch_endpoint(batch: GameStatsBatch):
+    """
+    Ендпоінт для пакетного збереження результатів з офлайн-черги гри.
+    Повторна відправка з тими ж idempotency_key безпечна: такі результати пропускаються.
+    """
+    # Кожен раунд коштує токен, як окремий /save_stats: пакет не обходить ліміт на користувача
+    unique_keys = {result.idempotency_key: result.user_id for result in batch.results}
+    results_by_user = Counter(unique_keys.values())
+    user_ids = set(results_by_user)
+    # Більше раундів одного гравця, ніж вміщує відро, пакет не пройде ніколи — це помилка клієнта
+    if max(results_by_user.values()) > SAVE_STATS_BURST:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Не більше {int(SAVE_STATS_BURST)} результатів одного гравця в пакеті."
+        )
+    enforce_users_rate(save_stats_buckets, results_by_user)
+    try:
+        result = await run_db(_save_stats_batch, batch)
+    except Exception as e:
+        logger.error(f"Помилка пакетного збереження статистики для users {sorted(user_ids)}: {e}")
+        raise HTTPException(status_code=500, detail="Внутрішня помилка сервера при збереженні статистики.")
+
+    for record in result["records"]:
+        live_hub.notify_score(record["user_id"], record["new_height"])
+    for user_id in user_ids:
+        live_hub.notify_user(user_id)
+
+    return {
+        "success": True,
+        "accepted": result["accepted"],
+        "duplicates": result["duplicates"],
+        "stats": result["stats"],
+    }
+
 @router.get("/stats/{user_id}")
 async def get_user_stats_endpoint(user_id: int):
     """Ендпоінт для отримання статистики користувача (ОНОВЛЕНО: повертає активний скін)."""
     try:
-        stats = db.get_user_stats(user_id)
+        stats = await run_db(db.get_user_stats, user_id)
         if stats:
             return {"success": True, "stats": stats}
         else:
@@ -53,7 +130,7 @@ async def get_user_stats_endpoint(user_id: int):
 async def get_leaderboard_endpoint():
     """Ендпоінт для отримання таблиці лідерів."""
     try:
-        leaderboard = db.get_leaderboard()
+        leaderboard = await run_db(db.get_leaderboard)
         return {"success": True, "leaderboard": leaderboard}
     except Exception as e:
         logger.error(f"Помилка отримання рейтингу: {e}")
@@ -65,7 +142,7 @@ async def get_leaderboard_endpoint():
 async def get_skins_endpoint(user_id: int):
     """Ендпоінт для отримання всіх скінів та їх статусу для користувача."""
     try:
-        skins = db.get_all_skins(user_id)
+        skins = await run_db(db.get_all_skins, user_id)
         return {"success": True, "skins": skins}
     except Exception as e:
         logger.error(f"Помилка отримання скінів для user {user_id}: {e}")
@@ -74,14 +151,105 @@ async def get_skins_endpoint(user_id: int):
 @router.post("/skin_action")
 async def skin_action_endpoint(action: SkinAction):
     """Ендпоінт для купівлі або активації скіна."""
+    enforce_user_rate(skin_action_buckets, action.user_id)
     if action.action_type == 'buy':
-        result = db.buy_skin(action.user_id, action.skin_id)
+        result = await run_db(db.buy_skin, action.user_id, action.skin_id)
     elif action.action_type == 'activate':
-        result = db.activate_skin(action.user_id, action.skin_id)
+        result = await run_db(db.activate_skin, action.user_id, action.skin_id)
     else:
         raise HTTPException(status_code=400, detail="Невідомий тип дії.")
     
     if not result.get("success"):
         raise HTTPException(status_code=400, detail=result.get("message"))
-        
+
+    # Баланс або активний скін змінилися — сповіщаємо відкриті WebApp користувача
+    live_hub.notify_user(action.user_id)
     return result
+
+# --- ТЕЛЕМЕТРІЯ РАУНДІВ ---
+
+def _save_telemetry(idempotency_key: str, payload: bytes, session: dict):
+    """Синхронна частина збереження телеметрії; виконується в потоці ігрового пулу."""
+    game = db.get_game_by_idempotency_key(idempotency_key)
+    if game is None:
+        return None
+    flags = check_plausibility(session, game["score"], game["beans_collected"])
+    if flags:
+        logger.warning(f"Неправдоподібний результат гри {game['id']} (user {game['user_id']}): {', '.join(flags)}")
+    stored = _get_telemetry_store().save(game, payload, session, flags)
+    return {"plausible": not flags, "duplicate": not stored}
+
+@router.post("/telemetry/{idempotency_key}")
+async def telemetry_endpoint(idempotency_key: str, request: Request):
+    """
+    Приймає бінарну телеметрію раунду (application/octet-stream), вже збереженого через /save_stats_batch.
+    Ключ ідемпотентності відомий лише клієнту, що зберіг гру, тож він же прив'язує телеметрію до games.
+    """
+    if _get_telemetry_store() is None:
+        raise HTTPException(status_code=503, detail="Телеметрія доступна лише для сховища SQLite.")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > TELEMETRY_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Завеликий пакет телеметрії.")
+
+    # Читаємо потік з обмеженням: заголовок Content-Length може бути відсутнім або хибним
+    payload = bytearray()
+    async for chunk in request.stream():
+        payload += chunk
+        if len(payload) > TELEMETRY_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Завеликий пакет телеметрії.")
+
+    try:
+        session = decode_session(bytes(payload))
+    except TelemetryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = await run_db(_save_telemetry, idempotency_key, bytes(payload), session)
+    except Exception as e:
+        logger.error(f"Помилка збереження телеметрії {idempotency_key}: {e}")
+        raise HTTPException(status_code=500, detail="Внутрішня помилка сервера при збереженні телеметрії.")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Гру не знайдено.")
+    return {"success": True, **result}
+
+# --- ЖИВІ ОНОВЛЕННЯ ---
+
+@router.get("/live/{user_id}")
+async def live_endpoint(user_id: int):
+    """SSE-потік: зміни топу гравців та власної статистики користувача."""
+    return StreamingResponse(
+        live_hub.stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# --- ЕКСПОРТ ДАНИХ ДЛЯ АНАЛІТИКИ ---
+
+@router.get("/export/{table}", include_in_schema=False)
+async def export_endpoint(
+    table: str,
+    format: str = "ndjson",
+    after: Optional[str] = None,
+    since: Optional[str] = None,
+    x_export_token: Optional[str] = Header(default=None),
+):
+    """Потоковий експорт таблиці у NDJSON/CSV. Доступний лише з токеном X-Export-Token."""
+    if not EXPORT_TOKEN or not x_export_token or not hmac.compare_digest(x_export_token, EXPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Доступ заборонено.")
+    if table not in EXPORT_TABLES or format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Невідома таблиця або формат.")
+    if not db.db_path:
+        raise HTTPException(status_code=503, detail="Експорт доступний лише для сховища SQLite.")
+    try:
+        cursor = parse_cursor(table, after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Синхронний генератор Starlette ітерує в пулі потоків, тож event loop не блокується
+    chunks = stream_export(db.db_path, table, fmt=format, after=cursor, since=since)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    )
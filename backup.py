@@ -0,0 +1,230 @@
+# backup.py: Онлайн-резервні копії бази даних через SQLite backup API.
+# Копіювання йде порціями сторінок з паузами між ними, тож save_game_result
+# та інші записи не блокуються на весь час створення копії.
+# Запис з іншого з'єднання між порціями змушує SQLite почати копіювання заново;
+# якщо база пишеться постійно, копія знімається одним кроком (читачі WAL не блокують запис).
+
+import asyncio
+import glob
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from config import (
+    BACKUP_DIR, BACKUP_INTERVAL, BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE, BACKUP_KEEP,
+    BACKUP_MAX_RESTARTS, BACKUP_MAX_DURATION,
+)
+from database import db
+from process_lease import ProcessLease
+
+logger = logging.getLogger(__name__)
+
+# Копії за розкладом робить лише один воркер uvicorn — власник цієї оренди
+LEASE_TTL = 60.0
+# Через скільки секунд повторити невдалу копію (але не пізніше за звичайний інтервал)
+FAILED_RETRY_DELAY = 10 * 60
+
+
+class BackupCancelled(Exception):
+    """Копіювання перервано через зупинку додатка."""
+
+
+class _IncrementalBackupStalled(Exception):
+    """Покрокове копіювання не встигає за записами — переходимо на копіювання одним кроком."""
+
+
+class BackupManager:
+    """
+    Створює, перевіряє та ротує резервні копії бази даних за розкладом.
+    """
+    def __init__(self, db_path: str = None, backup_dir: str = BACKUP_DIR,
+                 pages_per_step: int = BACKUP_PAGES_PER_STEP, step_pause: float = BACKUP_STEP_PAUSE,
+                 keep: int = BACKUP_KEEP, interval: float = BACKUP_INTERVAL,
+                 max_restarts: int = BACKUP_MAX_RESTARTS, max_duration: float = BACKUP_MAX_DURATION):
+        # Без явного шляху копіюється файл основного сховища
+        self._db_path = db_path
+        self.backup_dir = backup_dir
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.keep = keep
+        self.interval = interval
+        self.max_restarts = max_restarts
+        self.max_duration = max_duration
+        self._task = None
+        self._stopping = False
+        self._lease = None
+        self._is_leader = False
+        self._retry_at = 0.0
+
+    @property
+    def db_path(self):
+        return self._db_path or db.db_path
+
+    def _snapshot_prefix(self) -> str:
+        name = os.path.splitext(os.path.basename(self.db_path))[0]
+        return os.path.join(self.backup_dir, name)
+
+    def run_backup(self):
+        """
+        Синхронно створює резервну копію. Повертає звіт (шлях, розмір, тривалість,
+        швидкість) або None, якщо копіювання не вдалося.
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        # Мікросекунди: дві копії в одну секунду (ручна та за розкладом) не перезапишуть одна одну
+        final_path = f"{self._snapshot_prefix()}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db"
+        tmp_path = final_path + ".part"
+        progress = {"steps": 0, "pages": 0, "remaining": None, "restarts": 0, "mode": "incremental"}
+        started = time.monotonic()
+
+        def on_progress(status, remaining, total):
+            progress["steps"] += 1
+            progress["pages"] = total
+            if self._stopping:
+                raise BackupCancelled()
+            # Після перезапуску SQLite знову копіює з першої сторінки, тож залишок зростає
+            if progress["remaining"] is not None and remaining > progress["remaining"]:
+                progress["restarts"] += 1
+            progress["remaining"] = remaining
+            if remaining and (progress["restarts"] >= self.max_restarts
+                              or time.monotonic() - started > self.max_duration):
+                raise _IncrementalBackupStalled()
+            # Пауза між порціями: між ними записи до основної бази проходять без очікування
+            if remaining and self.step_pause:
+                time.sleep(self.step_pause)
+
+        try:
+            try:
+                integrity = self._copy(tmp_path, self.pages_per_step, on_progress)
+            except _IncrementalBackupStalled:
+                logger.warning(
+                    f"Покрокове копіювання перезапускалося {progress['restarts']} разів за "
+                    f"{time.monotonic() - started:.1f} с — копіюємо одним кроком."
+                )
+                progress["mode"] = "single_step"
+                self._remove(tmp_path)
+                integrity = self._copy(tmp_path, -1, None)
+        except BackupCancelled:
+            logger.info("Створення резервної копії перервано через зупинку додатка.")
+            self._remove(tmp_path)
+            return None
+        except sqlite3.Error as e:
+            logger.error(f"Помилка створення резервної копії: {e}")
+            self._remove(tmp_path)
+            return None
+
+        if integrity != "ok":
+            logger.error(f"Резервна копія не пройшла перевірку цілісності: {integrity}")
+            self._remove(tmp_path)
+            return None
+
+        os.replace(tmp_path, final_path)
+        duration = time.monotonic() - started
+        size = os.path.getsize(final_path)
+        report = {
+            "path": final_path,
+            "size_bytes": size,
+            "pages": progress["pages"],
+            "steps": progress["steps"],
+            "restarts": progress["restarts"],
+            "mode": progress["mode"],
+            "duration_s": round(duration, 3),
+            "throughput_mb_s": round(size / duration / 1024 / 1024, 2) if duration > 0 else None,
+        }
+        logger.info(
+            f"Резервну копію створено: {final_path} ({size} байт, {progress['pages']} сторінок "
+            f"за {progress['steps']} кроків, {report['duration_s']} с, {report['throughput_mb_s']} МБ/с)."
+        )
+        self.rotate()
+        return report
+
+    def _copy(self, tmp_path: str, pages: int, progress):
+        """Копіює базу у tmp_path і повертає результат перевірки цілісності копії."""
+        src = sqlite3.connect(self.db_path)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+            # Перевіряємо саме копію, а не оригінал
+            return dst.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            dst.close()
+            src.close()
+
+    def rotate(self):
+        """Видаляє найстаріші копії, залишаючи останні `keep`."""
+        snapshots = sorted(glob.glob(f"{self._snapshot_prefix()}-*.db"))
+        for path in snapshots[:-self.keep] if self.keep > 0 else []:
+            self._remove(path)
+            logger.info(f"Стару резервну копію видалено: {path}")
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def run_backup_async(self):
+        """Створює копію в окремому потоці, не блокуючи event loop."""
+        return await asyncio.to_thread(self.run_backup)
+
+    # --- Розклад ---
+
+    def seconds_until_due(self) -> float:
+        """
+        Скільки секунд до наступної копії. Відлік іде від найновішої копії на диску,
+        тож часті передеплої не відкладають копіювання безкінечно.
+        """
+        snapshots = glob.glob(f"{self._snapshot_prefix()}-*.db")
+        due = self._retry_at
+        if snapshots:
+            due = max(due, max(os.path.getmtime(path) for path in snapshots) + self.interval)
+        return due - time.time()
+
+    async def _lease_loop(self):
+        while True:
+            self._is_leader = await asyncio.to_thread(self._lease.try_acquire)
+            await asyncio.sleep(LEASE_TTL / 3)
+
+    async def _schedule_loop(self):
+        while True:
+            delay = LEASE_TTL / 3
+            if self._is_leader:
+                delay = min(delay, await asyncio.to_thread(self.seconds_until_due))
+                if delay <= 0:
+                    if await self.run_backup_async() is None:
+                        self._retry_at = time.time() + min(self.interval, FAILED_RETRY_DELAY)
+                    continue
+            await asyncio.sleep(delay)
+
+    async def _loop(self):
+        self._lease = await asyncio.to_thread(ProcessLease, self.db_path, "backup", LEASE_TTL)
+        try:
+            await asyncio.gather(self._lease_loop(), self._schedule_loop())
+        finally:
+            if self._is_leader:
+                self._is_leader = False
+                self._lease.release()
+
+    def start(self):
+        """
+        Запускає створення копій за розкладом (якщо інтервал задано).
+        Якщо остання копія старша за інтервал або копій немає, перша робиться одразу.
+        """
+        if self.interval <= 0 or not self.db_path:
+            logger.info("Резервне копіювання за розкладом вимкнено.")
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Резервне копіювання кожні {self.interval} с у {self.backup_dir}.")
+
+    async def stop(self):
+        """Зупиняє розклад і перериває копіювання, що виконується."""
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Створюємо єдиний екземпляр менеджера резервних копій
+backup_manager = BackupManager()
@@ -0,0 +1,153 @@
+# benchmark_bot_api.py: Бенчмарк пропускної здатності вихідних запитів до Bot API.
+# Піднімає локальний заглушковий сервер Bot API (з імітацією затримки мережі)
+# і вимірює, скільки sendMessage за секунду встигає відправити бот
+# за різних налаштувань пулу з'єднань, keep-alive та кількості одночасних запитів.
+#
+# Використання:
+#   python benchmark_bot_api.py --requests 1000 --concurrency 8 32 64 --pool-sizes 8 32 64 --latency 0.05
+#
+# Локальна заглушка не має TLS, тож ціна нового з'єднання тут набагато менша,
+# ніж з api.telegram.org: результати "без keep-alive" на реальному API будуть гіршими.
+#
+# Клієнт і заглушка ділять процесори машини. Якщо ядро одне, то за великої кількості
+# одночасних запитів швидкість з keep-alive упирається в CPU клієнта (пул httpcore
+# перебирає всі відкриті з'єднання на кожну подію), а не в мережу.
+#
+# HTTP/2 тут не вимірюється: uvicorn не підтримує h2c (HTTP/2 без TLS).
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+import urllib.request
+
+import uvicorn
+from fastapi import FastAPI
+from telegram import Bot
+
+from bot_request import TunedHTTPXRequest
+
+BENCH_TOKEN = "123456:BENCHMARK"
+
+
+def build_stub_app(latency: float) -> FastAPI:
+    """Мінімальна заглушка Bot API: getMe та sendMessage."""
+    app = FastAPI()
+    counter = {"message_id": 0}
+
+    @app.post("/bot{token}/getMe")
+    async def get_me(token: str):
+        return {"ok": True, "result": {
+            "id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"
+        }}
+
+    @app.post("/bot{token}/sendMessage")
+    async def send_message(token: str):
+        await asyncio.sleep(latency)
+        counter["message_id"] += 1
+        return {"ok": True, "result": {
+            "message_id": counter["message_id"], "date": int(time.time()),
+            "chat": {"id": 1, "type": "private"}, "text": "ok"
+        }}
+
+    return app
+
+
+def _serve_stub(sock: socket.socket, latency: float):
+    config = uvicorn.Config(build_stub_app(latency), log_level="warning", access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def start_stub_server(latency: float):
+    """
+    Запускає заглушку в окремому процесі: у потоці того ж процесу сервер і клієнт ділили б GIL,
+    і бенчмарк міряв би конкуренцію за інтерпретатор, а не мережевий шлях.
+    Повертає (process, port).
+    """
+    # Протокол вказуємо явно: asyncio вмикає TCP_NODELAY на прийнятих з'єднаннях лише для сокетів
+    # з proto == IPPROTO_TCP, а socket.socket() створює proto 0. Тоді відповіді йшли б з Nagle,
+    # і на keep-alive з'єднанні кожен запит чекав би delayed ACK клієнта.
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.listen(1024)
+    process = multiprocessing.Process(target=_serve_stub, args=(sock, latency), daemon=True)
+    process.start()
+    # Чекаємо, доки заглушка почне відповідати
+    while True:
+        try:
+            urllib.request.urlopen(urllib.request.Request(
+                f"http://127.0.0.1:{port}/bot{BENCH_TOKEN}/getMe", method="POST"), timeout=1)
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, port
+
+
+async def run_case(port: int, pool_size: int, keepalive: int, requests: int, concurrency: int):
+    """Відправляє `requests` повідомлень з `concurrency` одночасних задач; повертає повідомлень/с."""
+    request = TunedHTTPXRequest(
+        connection_pool_size=pool_size,
+        keepalive_connections=keepalive,
+        pool_timeout=None,  # у бенчмарку чекаємо на вільне з'єднання, а не падаємо
+    )
+    bot = Bot(BENCH_TOKEN, base_url=f"http://127.0.0.1:{port}/bot", request=request)
+    await bot.initialize()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def send(i: int):
+        nonlocal errors
+        async with semaphore:
+            try:
+                await bot.send_message(chat_id=1, text=f"message {i}")
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await bot.shutdown()
+    return requests / elapsed, errors
+
+
+async def main_async(args):
+    process, port = start_stub_server(args.latency)
+    try:
+        print(f"Заглушка Bot API: 127.0.0.1:{port}, затримка {args.latency * 1000:.0f} мс, "
+              f"{args.requests} запитів на кожен випадок\n")
+        print(f"{'concurrency':>11} {'pool':>6} {'keep-alive':>11} {'msg/s':>10} {'errors':>7}")
+        suspicious = []
+        for concurrency in args.concurrency:
+            for pool_size in args.pool_sizes:
+                rates = {}
+                for keepalive in (pool_size, 0):
+                    rate, errors = await run_case(port, pool_size, keepalive, args.requests, concurrency)
+                    rates[bool(keepalive)] = rate
+                    print(f"{concurrency:>11} {pool_size:>6} {('так' if keepalive else 'ні'):>11} "
+                          f"{rate:>10.1f} {errors:>7}")
+                # Повторне використання з'єднання не може бути дорожчим за нове — інакше вимір зламаний
+                if rates[True] < rates[False] * 0.9:
+                    suspicious.append((concurrency, pool_size))
+        if suspicious:
+            print(f"\nУВАГА: keep-alive повільніший за нові з'єднання для (concurrency, pool) {suspicious}. "
+                  "Імовірно, вимір спотворений (Nagle/delayed ACK або нестача ресурсів), а не ціна keep-alive.")
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк вихідних запитів до Bot API.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--latency", type=float, default=0.05, help="Затримка відповіді заглушки, с.")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[8, 32, 64])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmark_storage.py: Порівняння швидкодії сховищ SQLite та in-memory.
+# Проганяє однаковий сценарій (користувачі, ігри, пакети, рейтинг, скіни) на обох
+# реалізаціях і виводить час виконання. Однакову поведінку сховищ перевіряють
+# тести tests/test_storage_conformance.py.
+#
+# Використання:
+#   python benchmark_storage.py --users 2000 --games 20000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# config.py вимагає ці змінні; для бенчмарку вони не потрібні
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("WEBAPP_URL", "http://localhost")
+
+from database import create_storage  # noqa: E402
+from models import GameResult  # noqa: E402
+
+
+def run_scenario(storage, users: int, games: int, seed: int = 42):
+    """Виконує сценарій і повертає (кількість операцій, тривалість у секундах)."""
+    rng = random.Random(seed)
+    operations = 0
+    started = time.perf_counter()
+
+    for user_id in range(1, users + 1):
+        storage.save_or_update_user(user_id, f"user{user_id}", f"Name {user_id}")
+    operations += users
+
+    for _ in range(games):
+        storage.save_game_result(rng.randint(1, users), rng.randint(0, 3000), rng.randint(0, 400))
+    operations += games
+
+    # Пакет з дублікатами всередині та повторна відправка того самого пакета
+    batch = [
+        GameResult(user_id=rng.randint(1, users + 5), username="batch", score=rng.randint(0, 5000),
+                   collected_beans=rng.randint(0, 50), idempotency_key=f"key-{i:08d}")
+        for i in range(200)
+    ]
+    storage.save_game_results_batch(batch + batch[:10])
+    storage.save_game_results_batch(batch)
+    for i in range(200):
+        storage.get_game_by_idempotency_key(f"key-{i:08d}")
+    operations += 202
+
+    for _ in range(100):
+        storage.get_leaderboard()
+        storage.get_overtaken_users(1, 1000, 2500, limit=30)
+    operations += 200
+
+    for user_id in range(1, 101):
+        storage.buy_skin(user_id, 2)
+        storage.activate_skin(user_id, 2)
+        storage.get_all_skins(user_id)
+    operations += 300
+
+    for user_id in range(1, users + 1):
+        storage.get_user_stats(user_id)
+    operations += users
+
+    return operations, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сховищ SQLite та in-memory.")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--games", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_storage = create_storage("sqlite", os.path.join(tmp, "bench.db"))
+        operations, sqlite_time = run_scenario(sqlite_storage, args.users, args.games)
+    _, memory_time = run_scenario(create_storage("memory"), args.users, args.games)
+
+    print(f"Сценарій: {args.users} користувачів, {args.games} ігор, {operations} операцій")
+    print(f"{'sqlite':>8}: {sqlite_time:8.3f} с  ({operations / sqlite_time:,.0f} оп/с)")
+    print(f"{'memory':>8}: {memory_time:8.3f} с  ({operations / memory_time:,.0f} оп/с, x{sqlite_time / memory_time:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
@@ -6,8 +7,15 @@ from telegram.constants import ParseMode
 from telegram.error import RetryAfter
 
 # Імпортуємо конфігурацію та базу даних
-from config import BOT_TOKEN, WEBAPP_URL
+from config import (
+    BOT_TOKEN, WEBAPP_URL, ADMIN_IDS,
+    BOT_POOL_SIZE, BOT_KEEPALIVE_CONNECTIONS, BOT_KEEPALIVE_EXPIRY, BOT_HTTP_VERSION,
+    BOT_CONNECT_TIMEOUT, BOT_READ_TIMEOUT, BOT_WRITE_TIMEOUT, BOT_POOL_TIMEOUT,
+    BOT_MEDIA_WRITE_TIMEOUT, BOT_METHOD_READ_TIMEOUTS, BOT_CONCURRENT_UPDATES,
+)
+from bot_request import TunedHTTPXRequest, parse_method_timeouts
 from database import db
+from notifier import notifier
 
 # Налаштування логера
 logger = logging.getLogger(__name__)
@@ -127,6 +135,46 @@ class PerkyCoffeeBot:
         # ВИПРАВЛЕНО: Видалено 'parse_mode=ParseMode.HTML'
         await update.message.reply_html(welcome_message, reply_markup=reply_markup)
 
+    def _is_admin(self, update: Update) -> bool:
+        user = update.effective_user
+        return user is not None and user.id in ADMIN_IDS
+
+    async def broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обробка команди /broadcast <текст>: розсилка всім гравцям (лише для адміністраторів)."""
+        if not self._is_admin(update):
+            return
+        # text_html зберігає форматування адміністратора; відкидаємо саму команду
+        parts = update.message.text_html.split(maxsplit=1)
+        if len(parts) < 2:
+            await update.message.reply_text("Використання: /broadcast <текст повідомлення>")
+            return
+        # Створення розсилки пише в SQLite, тож виконуємо його поза event loop
+        job_id = await asyncio.to_thread(notifier.broadcast, parts[1])
+        if job_id is None:
+            await update.message.reply_text("Не вдалося створити розсилку.")
+            return
+        job = await asyncio.to_thread(notifier.get_job, job_id)
+        total = job['total'] if job else '?'
+        await update.message.reply_text(
+            f"Розсилку #{job_id} поставлено в чергу ({total} адресатів). Прогрес: /broadcast_status {job_id}"
+        )
+
+    async def broadcast_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обробка команди /broadcast_status <id>: прогрес розсилки (лише для адміністраторів)."""
+        if not self._is_admin(update):
+            return
+        if not context.args or not context.args[0].isdigit():
+            await update.message.reply_text("Використання: /broadcast_status <id розсилки>")
+            return
+        job = await asyncio.to_thread(notifier.get_job, int(context.args[0]))
+        if job is None:
+            await update.message.reply_text("Розсилку не знайдено.")
+            return
+        await update.message.reply_text(
+            f"Розсилка #{job['id']} ({job['kind']}): {job['status']}. "
+            f"Надіслано {job['sent']} з {job['total']}, помилок {job['failed']}."
+        )
+
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обробка натискань на кнопки."""
         query = update.callback_query
@@ -307,13 +355,38 @@ class PerkyCoffeeBot:
 # Створюємо єдиний екземпляр бота
 perky_bot = PerkyCoffeeBot()
 
+def build_bot_request():
+    """Створює HTTP-клієнт для Bot API з налаштувань config.py."""
+    return TunedHTTPXRequest(
+        connection_pool_size=BOT_POOL_SIZE,
+        keepalive_connections=BOT_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=BOT_KEEPALIVE_EXPIRY,
+        method_read_timeouts=parse_method_timeouts(BOT_METHOD_READ_TIMEOUTS),
+        http_version=BOT_HTTP_VERSION,
+        connect_timeout=BOT_CONNECT_TIMEOUT,
+        read_timeout=BOT_READ_TIMEOUT,
+        write_timeout=BOT_WRITE_TIMEOUT,
+        pool_timeout=BOT_POOL_TIMEOUT,
+        media_write_timeout=BOT_MEDIA_WRITE_TIMEOUT,
+    )
+
 async def setup_bot_handlers():
     """Створює та налаштовує додаток бота."""
     logger.info("Ініціалізація додатку Telegram-бота...")
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(build_bot_request())
+        .concurrent_updates(BOT_CONCURRENT_UPDATES)
+        # Оновлення приходять через вебхук, тож Updater (long polling) не потрібен
+        .updater(None)
+        .build()
+    )
     
     # Реєструємо обробники
     application.add_handler(CommandHandler("start", perky_bot.start))
+    application.add_handler(CommandHandler("broadcast", perky_bot.broadcast))
+    application.add_handler(CommandHandler("broadcast_status", perky_bot.broadcast_status))
     application.add_handler(CallbackQueryHandler(perky_bot.button_callback))
     
     perky_bot.application = application
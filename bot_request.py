@@ -0,0 +1,53 @@
+# bot_request.py: HTTP-шар для вихідних запитів до Bot API.
+# Дозволяє налаштувати пул з'єднань, keep-alive, HTTP/2 і таймаути окремо для методів.
+# Модуль не залежить від config.py, тож його можна використовувати в бенчмарках.
+
+import httpx
+from telegram.request import BaseRequest, HTTPXRequest
+
+
+def parse_method_timeouts(value: str) -> dict:
+    """
+    Розбирає рядок виду "sendMessage=10,editMessageText=3" у словник
+    {метод: read_timeout у секундах}.
+    """
+    timeouts = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        method, seconds = item.split("=", 1)
+        timeouts[method.strip()] = float(seconds)
+    return timeouts
+
+
+class TunedHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest з власними лімітами keep-alive та read-таймаутами для окремих методів Bot API.
+    Таймаут, явно переданий у виклик методу бота, завжди має пріоритет.
+
+    Ліміти передаються через httpx_kwargs, а не через socket_options: з socket_options
+    PTB створює власний транспорт, і httpx ігнорує ліміти пулу та налаштування HTTP/2.
+    """
+    def __init__(self, connection_pool_size: int = 256, keepalive_connections: int = None,
+                 keepalive_expiry: float = 30.0, method_read_timeouts: dict = None, **kwargs):
+        limits = httpx.Limits(
+            max_connections=connection_pool_size,
+            max_keepalive_connections=connection_pool_size if keepalive_connections is None else keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        super().__init__(connection_pool_size=connection_pool_size, httpx_kwargs={"limits": limits}, **kwargs)
+        self.method_read_timeouts = method_read_timeouts or {}
+
+    async def do_request(self, url: str, method: str, request_data=None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE, pool_timeout=BaseRequest.DEFAULT_NONE):
+        if read_timeout is BaseRequest.DEFAULT_NONE and self.method_read_timeouts:
+            # URL має вигляд .../bot<token>/<methodName>
+            api_method = url.rsplit("/", 1)[-1]
+            if api_method in self.method_read_timeouts:
+                read_timeout = self.method_read_timeouts[api_method]
+        return await super().do_request(
+            url, method, request_data,
+            read_timeout=read_timeout, write_timeout=write_timeout,
+            connect_timeout=connect_timeout, pool_timeout=pool_timeout,
+        )
@@ -16,6 +16,97 @@ WEBAPP_URL = os.getenv('WEBAPP_URL')
 # Порт для запуску Uvicorn
 PORT = int(os.getenv('PORT', 8000))
 
+# Шлях до файлу бази даних SQLite
+DB_PATH = os.getenv('DB_PATH', 'perky_jump.db')
+
+# Сховище даних: 'sqlite' (за замовчуванням) або 'memory' (для тестів і бенчмарків, без диска)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+
+# Токен для захищеного ендпоінту експорту (/export/...). Без нього експорт вимкнено.
+EXPORT_TOKEN = os.getenv('EXPORT_TOKEN')
+
+# Telegram ID адміністраторів через кому: лише вони можуть запускати розсилки командою /broadcast
+ADMIN_IDS = {int(admin_id) for admin_id in os.getenv('ADMIN_IDS', '').split(',') if admin_id.strip()}
+
+# --- HTTP-клієнт для вихідних запитів до Bot API ---
+# Розмір пулу з'єднань (одночасні запити до Telegram)
+BOT_POOL_SIZE = int(os.getenv('BOT_POOL_SIZE', 64))
+# Скільки з'єднань тримати відкритими (keep-alive) і як довго; за замовчуванням — увесь пул
+BOT_KEEPALIVE_CONNECTIONS = int(os.getenv('BOT_KEEPALIVE_CONNECTIONS', BOT_POOL_SIZE))
+BOT_KEEPALIVE_EXPIRY = float(os.getenv('BOT_KEEPALIVE_EXPIRY', 30))
+# "1.1" або "2" (для HTTP/2 потрібен пакет h2: python-telegram-bot[http2])
+BOT_HTTP_VERSION = os.getenv('BOT_HTTP_VERSION', '1.1')
+# Таймаути в секундах
+BOT_CONNECT_TIMEOUT = float(os.getenv('BOT_CONNECT_TIMEOUT', 5))
+BOT_READ_TIMEOUT = float(os.getenv('BOT_READ_TIMEOUT', 5))
+BOT_WRITE_TIMEOUT = float(os.getenv('BOT_WRITE_TIMEOUT', 5))
+BOT_POOL_TIMEOUT = float(os.getenv('BOT_POOL_TIMEOUT', 1))
+BOT_MEDIA_WRITE_TIMEOUT = float(os.getenv('BOT_MEDIA_WRITE_TIMEOUT', 20))
+# Read-таймаути для окремих методів, напр. "setWebhook=15,answerCallbackQuery=2"
+BOT_METHOD_READ_TIMEOUTS = os.getenv('BOT_METHOD_READ_TIMEOUTS', 'setWebhook=15,deleteWebhook=15')
+# Скільки оновлень від Telegram обробляти одночасно (1 — послідовно)
+BOT_CONCURRENT_UPDATES = int(os.getenv('BOT_CONCURRENT_UPDATES', 32))
+
+# --- Резервні копії бази даних ---
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+# Інтервал між копіями в секундах (0 — вимкнено)
+BACKUP_INTERVAL = float(os.getenv('BACKUP_INTERVAL', 6 * 60 * 60))
+# Скільки сторінок копіювати за крок і скільки чекати між кроками
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', 256))
+BACKUP_STEP_PAUSE = float(os.getenv('BACKUP_STEP_PAUSE', 0.01))
+# Запис у базу між кроками перезапускає копіювання; після стількох перезапусків
+# або після BACKUP_MAX_DURATION секунд копія знімається одним кроком
+BACKUP_MAX_RESTARTS = int(os.getenv('BACKUP_MAX_RESTARTS', 3))
+BACKUP_MAX_DURATION = float(os.getenv('BACKUP_MAX_DURATION', 120))
+# Скільки останніх копій зберігати
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 7))
+
+# --- Розсилки та сповіщення бота ---
+# Telegram дозволяє ~30 повідомлень/с глобально і ~1 повідомлення/с в один чат.
+NOTIFY_GLOBAL_RATE = float(os.getenv('NOTIFY_GLOBAL_RATE', 25))
+NOTIFY_CHAT_RATE = float(os.getenv('NOTIFY_CHAT_RATE', 1))
+# Кількість одночасних запитів до Bot API під час розсилки
+NOTIFY_WORKERS = int(os.getenv('NOTIFY_WORKERS', 16))
+# Скільки повідомлень диспетчер забирає з бази за раз
+NOTIFY_BATCH_SIZE = int(os.getenv('NOTIFY_BATCH_SIZE', 200))
+# Після стількох мережевих збоїв повідомлення вважається невідправленим
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', 5))
+# Скільки обійдених гравців сповіщати про побитий рекорд
+NOTIFY_RECORD_LIMIT = int(os.getenv('NOTIFY_RECORD_LIMIT', 20))
+# Не частіше одного сповіщення про побитий рекорд в один чат за стільки секунд
+NOTIFY_RECORD_COOLDOWN = float(os.getenv('NOTIFY_RECORD_COOLDOWN', 6 * 3600))
+# Розсилки відправляє лише один воркер uvicorn; оренда цієї ролі діє стільки секунд
+NOTIFY_LEASE_TTL = float(os.getenv('NOTIFY_LEASE_TTL', 30))
+# Повідомлення, взяте в роботу процесом, що впав, повертається в чергу через стільки секунд
+NOTIFY_CLAIM_TIMEOUT = float(os.getenv('NOTIFY_CLAIM_TIMEOUT', 300))
+
+# --- Контроль допуску до ігрового API ---
+# Максимум одночасних запитів ігрового API; зайві одразу отримують 503
+API_MAX_CONCURRENCY = int(os.getenv('API_MAX_CONCURRENCY', 64))
+# Окремий ліміт для вебхука Telegram — ігрове навантаження його не займає
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv('WEBHOOK_MAX_CONCURRENCY', 32))
+# Потоки для синхронних запитів до БД з ігрового API
+API_DB_THREADS = int(os.getenv('API_DB_THREADS', 8))
+# Ліміти на користувача: запитів за секунду та розмір "запасу"
+SAVE_STATS_RATE = float(os.getenv('SAVE_STATS_RATE', 0.5))
+SAVE_STATS_BURST = float(os.getenv('SAVE_STATS_BURST', 5))
+SKIN_ACTION_RATE = float(os.getenv('SKIN_ACTION_RATE', 2))
+SKIN_ACTION_BURST = float(os.getenv('SKIN_ACTION_BURST', 10))
+
+# --- Живі оновлення WebApp (SSE) ---
+# Не частіше одного оновлення за стільки секунд на клієнта
+LIVE_INTERVAL = float(os.getenv('LIVE_INTERVAL', 2))
+# Розмір топу, що транслюється клієнтам
+LIVE_TOP_N = int(os.getenv('LIVE_TOP_N', 10))
+# Як часто надсилати heartbeat, щоб проксі не закривали простоюючі з'єднання
+LIVE_HEARTBEAT = float(os.getenv('LIVE_HEARTBEAT', 15))
+# Максимум одночасних SSE-з'єднань на процес
+LIVE_MAX_CONNECTIONS = int(os.getenv('LIVE_MAX_CONNECTIONS', 5000))
+
+# --- Телеметрія раундів ---
+# Максимальний розмір бінарного пакета телеметрії; ~2 КБ на 10 хвилин гри
+TELEMETRY_MAX_BYTES = int(os.getenv('TELEMETRY_MAX_BYTES', 32 * 1024))
+
 # --- Перевірка наявності змінних ---
 # Якщо токен або URL не знайдено, програма не запуститься. Це безпечно.
 if not BOT_TOKEN:
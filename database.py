@@ -1,17 +1,42 @@
 import sqlite3
 import logging
+import threading
 try:
-    from config import DB_PATH
+    from config import DB_PATH, STORAGE_BACKEND
 except ImportError:
     # Припускаємо стандартний шлях для локальної розробки
     DB_PATH = 'perky_jump.db'
+    STORAGE_BACKEND = 'sqlite'
+
+from storage import LazyStorage, Storage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class Database:
+def initial_skins():
+    """Початкові 12 скінів магазину: (name, price, is_default, svg_data)."""
+    # Перший скін - Default Robot
+    skins_data = [
+        ("Default Robot", 0, True, "default_robot.svg"), 
+    ]
+
+    # Додаємо 11 додаткових скінів (skin_1.svg до skin_11.svg)
+    # Ціни поступово зростають для стимуляції накопичення зерен
+    base_price = 400
+    for i in range(1, 12):
+        price = base_price + (i * 150) # Ціни від 550 до 2050
+        name = f"Skin #{i}"
+        svg_file = f"skin_{i}.svg"
+        skins_data.append((name, price, False, svg_file))
+    return skins_data
+
+class Database(Storage):
+    """Сховище на SQLite."""
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        # Постійне з'єднання лише для PRAGMA data_version: лічильник прив'язаний до з'єднання
+        self._version_conn = None
+        self._version_lock = threading.Lock()
         self.init_database()
 
     def _get_connection(self):
@@ -23,6 +48,8 @@ class Database:
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
+                # WAL: читачі (експорт, аналітика) не блокують запис результатів ігор
+                cursor.execute("PRAGMA journal_mode=WAL")
                 # Таблиця користувачів (ОНОВЛЕНО: Додано active_skin_id)
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS users (
@@ -71,6 +98,16 @@ class Database:
                     )
                 ''')
                 
+                # --- ДОДАНО: Ключі ідемпотентності для пакетного збереження результатів ---
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS game_idempotency_keys (
+                        idempotency_key TEXT PRIMARY KEY,
+                        user_id INTEGER,
+                        game_id INTEGER,
+                        FOREIGN KEY (game_id) REFERENCES games (id)
+                    )
+                ''')
+                
                 # Заповнення скінами, якщо таблиця пуста
                 cursor.execute("SELECT COUNT(*) FROM skins")
                 if cursor.fetchone()[0] == 0:
@@ -86,24 +123,9 @@ class Database:
 
     def _populate_initial_skins(self, cursor):
         """Заповнює таблицю скінів початковими даними, використовуючи 12 скінів."""
-        
-        # Перший скін - Default Robot
-        skins_data = [
-            ("Default Robot", 0, True, "default_robot.svg"), 
-        ]
-
-        # Додаємо 11 додаткових скінів (skin_1.svg до skin_11.svg)
-        # Ціни поступово зростають для стимуляції накопичення зерен
-        base_price = 400
-        for i in range(1, 12):
-            price = base_price + (i * 150) # Ціни від 550 до 2050
-            name = f"Skin #{i}"
-            svg_file = f"skin_{i}.svg"
-            skins_data.append((name, price, False, svg_file))
-        
         cursor.executemany(
             "INSERT INTO skins (name, price, is_default, svg_data) VALUES (?, ?, ?, ?)",
-            skins_data
+            initial_skins()
         )
         logger.info("Початкові 12 скінів додано.")
 
@@ -135,6 +157,44 @@ class Database:
             logger.error(f"Помилка отримання статистики для user {user_id}: {e}")
             return None
 
+    def get_users_stats(self, user_ids):
+        """Статистика кількох користувачів кількома запитами замість запиту на кожного."""
+        user_ids = list(user_ids)
+        stats = {}
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                # Частинами, щоб не впертися в ліміт параметрів SQLite
+                for start in range(0, len(user_ids), 500):
+                    chunk = user_ids[start:start + 500]
+                    cursor.execute(f"""
+                        SELECT u.*, s.svg_data AS active_skin
+                        FROM users u
+                        JOIN skins s ON u.active_skin_id = s.id
+                        WHERE u.user_id IN ({','.join('?' * len(chunk))})
+                    """, chunk)
+                    for row in cursor.fetchall():
+                        stats[row["user_id"]] = dict(row)
+            return stats
+        except sqlite3.Error as e:
+            logger.error(f"Помилка отримання статистики {len(user_ids)} користувачів: {e}")
+            return stats
+
+    def data_version(self):
+        """
+        PRAGMA data_version постійного з'єднання: змінюється після кожного коміту
+        з інших з'єднань, у тому числі з інших воркерів uvicorn. None при помилці.
+        """
+        try:
+            with self._version_lock:
+                if self._version_conn is None:
+                    self._version_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Помилка читання версії даних: {e}")
+            return None
+
     def save_or_update_user(self, user_id: int, username: str, first_name: str):
         """Створює нового користувача або оновлює дані існуючого."""
         try:
@@ -175,6 +235,142 @@ class Database:
         except sqlite3.Error as e:
             logger.error(f"Помилка збереження результату гри для user {user_id}: {e}")
 
+    def save_game_results_batch(self, results):
+        """
+        Зберігає пакет результатів однією транзакцією.
+        results — список об'єктів з полями user_id, username, first_name, score,
+        collected_beans, idempotency_key. Результати з уже відомими ключами пропускаються.
+        Повертає accepted/duplicates (ключі), records (побиті рекорди) та stats (по user_id).
+        """
+        # Дублікати всередині самого пакета теж відкидаємо
+        unique = {}
+        for result in results:
+            unique.setdefault(result.idempotency_key, result)
+
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                # sqlite3 сам відкрив би транзакцію лише перед першим INSERT, і читання нижче
+                # (дублікати, старі рекорди) бачили б дані до чужого запису між ними й UPDATE.
+                # BEGIN IMMEDIATE одразу бере блокування на запис.
+                cursor.execute("BEGIN IMMEDIATE")
+
+                keys = list(unique)
+                cursor.execute(
+                    f"SELECT idempotency_key FROM game_idempotency_keys WHERE idempotency_key IN ({','.join('?' * len(keys))})",
+                    keys
+                )
+                duplicates = [row[0] for row in cursor.fetchall()]
+                known = set(duplicates)
+                new_results = [unique[key] for key in keys if key not in known]
+
+                # Агрегуємо зміни по користувачах, щоб оновити кожного одним UPDATE
+                deltas = {}
+                for result in new_results:
+                    delta = deltas.setdefault(result.user_id, {
+                        "username": None, "first_name": None, "max_score": 0, "beans": 0, "games": 0
+                    })
+                    delta["username"] = result.username
+                    delta["first_name"] = result.first_name
+                    delta["max_score"] = max(delta["max_score"], result.score)
+                    delta["beans"] += result.collected_beans
+                    delta["games"] += 1
+
+                records = []
+                if new_results:
+                    user_ids = list(deltas)
+                    cursor.execute(
+                        f"SELECT user_id, max_height FROM users WHERE user_id IN ({','.join('?' * len(user_ids))})",
+                        user_ids
+                    )
+                    old_heights = {row[0]: row[1] for row in cursor.fetchall()}
+
+                    cursor.executemany('''
+                        INSERT INTO users (user_id, username, first_name)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            username = excluded.username,
+                            first_name = excluded.first_name
+                    ''', [(user_id, d["username"], d["first_name"]) for user_id, d in deltas.items()])
+                    cursor.executemany('''
+                        INSERT OR IGNORE INTO user_skins (user_id, skin_id)
+                        SELECT ?, id FROM skins WHERE is_default = TRUE LIMIT 1
+                    ''', [(user_id,) for user_id in user_ids])
+
+                    cursor.executemany(
+                        "INSERT INTO games (user_id, score, beans_collected) VALUES (?, ?, ?)",
+                        [(r.user_id, r.score, r.collected_beans) for r in new_results]
+                    )
+                    # AUTOINCREMENT у межах однієї транзакції видає послідовні id
+                    last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    first_id = last_id - len(new_results) + 1
+                    cursor.executemany(
+                        "INSERT INTO game_idempotency_keys (idempotency_key, user_id, game_id) VALUES (?, ?, ?)",
+                        [(r.idempotency_key, r.user_id, first_id + i) for i, r in enumerate(new_results)]
+                    )
+
+                    cursor.executemany('''
+                        UPDATE users SET
+                            max_height = MAX(max_height, ?),
+                            total_beans = total_beans + ?,
+                            games_played = games_played + ?,
+                            last_played = CURRENT_TIMESTAMP
+                        WHERE user_id = ?
+                    ''', [(d["max_score"], d["beans"], d["games"], user_id) for user_id, d in deltas.items()])
+
+                    for user_id, d in deltas.items():
+                        old_height = old_heights.get(user_id, 0)
+                        if d["max_score"] > old_height:
+                            records.append({
+                                "user_id": user_id,
+                                "name": d["username"] or d["first_name"],
+                                "old_height": old_height,
+                                "new_height": d["max_score"],
+                            })
+
+                conn.commit()
+
+                stats = {}
+                for user_id in {result.user_id for result in unique.values()}:
+                    cursor.execute("""
+                        SELECT u.*, s.svg_data AS active_skin
+                        FROM users u
+                        JOIN skins s ON u.active_skin_id = s.id
+                        WHERE u.user_id = ?
+                    """, (user_id,))
+                    row = cursor.fetchone()
+                    if row:
+                        stats[user_id] = dict(row)
+
+                return {
+                    "accepted": [r.idempotency_key for r in new_results],
+                    "duplicates": duplicates,
+                    "records": records,
+                    "stats": stats,
+                }
+        except sqlite3.Error as e:
+            logger.error(f"Помилка пакетного збереження {len(unique)} результатів: {e}")
+            return None
+
+    def get_game_by_idempotency_key(self, idempotency_key: str):
+        """Знаходить гру, збережену пакетом з цим ключем ідемпотентності."""
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT g.id, g.user_id, g.score, g.beans_collected
+                    FROM game_idempotency_keys k
+                    JOIN games g ON g.id = k.game_id
+                    WHERE k.idempotency_key = ?
+                ''', (idempotency_key,))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Помилка пошуку гри за ключем {idempotency_key}: {e}")
+            return None
+
     def get_leaderboard(self, limit: int = 10):
         """Отримує топ гравців за максимальною висотою."""
         try:
@@ -184,7 +380,7 @@ class Database:
                 cursor.execute('''
                     SELECT username, first_name, max_height FROM users
                     WHERE games_played > 0
-                    ORDER BY max_height DESC
+                    ORDER BY max_height DESC, user_id
                     LIMIT ?
                 ''', (limit,))
                 return [dict(row) for row in cursor.fetchall()]
@@ -192,8 +388,37 @@ class Database:
             logger.error(f"Помилка отримання рейтингу: {e}")
             return []
 
+    def get_overtaken_users(self, user_id: int, old_height: int, new_height: int, limit: int = 20):
+        """Повертає ID гравців, чий рекорд лежить між старим і новим рекордом user_id."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT user_id FROM users
+                    WHERE games_played > 0 AND user_id != ?
+                      AND max_height >= ? AND max_height < ?
+                    ORDER BY max_height DESC, user_id
+                    LIMIT ?
+                ''', (user_id, old_height, new_height, limit))
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Помилка пошуку обійдених гравців для user {user_id}: {e}")
+            return []
+
     # --- НОВІ МЕТОДИ ДЛЯ СКІНІВ ---
 
+    def get_skins_after(self, skin_id: int):
+        """Повертає скіни з id більшим за skin_id (нові надходження в магазин)."""
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, price FROM skins WHERE id > ? ORDER BY id", (skin_id,))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Помилка отримання нових скінів: {e}")
+            return []
+
     def get_all_skins(self, user_id: int):
         """Отримує всі скіни, позначаючи, які куплені та активні для користувача."""
         try:
@@ -233,7 +458,10 @@ class Database:
                 
                 # 2. Перевірка балансу користувача
                 cursor.execute("SELECT total_beans FROM users WHERE user_id = ?", (user_id,))
-                user_beans = cursor.fetchone()[0]
+                user = cursor.fetchone()
+                if not user:
+                    return {"success": False, "message": "Користувача не знайдено."}
+                user_beans = user[0]
                 
                 if user_beans < price:
                     return {"success": False, "message": "Недостатньо кавових зерен."}
@@ -259,6 +487,10 @@ class Database:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
+                cursor.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
+                if not cursor.fetchone():
+                    return {"success": False, "message": "Користувача не знайдено."}
+
                 # 1. Перевірка, чи належить скін користувачу або чи це дефолтний скін
                 cursor.execute("""
                     SELECT 
@@ -290,5 +522,15 @@ class Database:
             logger.error(f"Помилка активації скіна {skin_id} для user {user_id}: {e}")
             return {"success": False, "message": f"Помилка БД: {e}"}
 
-# Створюємо єдиний екземпляр класу для всього додатку
-db = Database()
+def create_storage(backend: str = STORAGE_BACKEND, db_path: str = DB_PATH) -> Storage:
+    """Створює сховище за назвою бекенду: 'sqlite' або 'memory'."""
+    if backend == 'sqlite':
+        return Database(db_path)
+    if backend == 'memory':
+        from memory_storage import MemoryDatabase
+        return MemoryDatabase()
+    raise ValueError(f"Невідомий бекенд сховища: {backend}")
+
+# Єдиний екземпляр для всього додатку. Саме сховище створюється ліниво
+# (у lifespan або при першому зверненні), тож імпорт модуля не чіпає диск.
+db = LazyStorage(create_storage)
@@ -0,0 +1,186 @@
+# export.py: Потоковий експорт таблиць users, games та user_skins у NDJSON або CSV.
+# Рядки читаються порціями з keyset-пагінацією: кожна порція — окрема коротка
+# транзакція читання, тож експорт не тримає блокування і не заважає save_game_result.
+#
+# Використання з командного рядка:
+#   python export.py games --format csv --after 1500 --out games.csv
+#   python export.py users --format ndjson > users.ndjson
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Ключ пагінації для кожної таблиці. Він має бути унікальним і покритим індексом.
+EXPORT_TABLES = {
+    "users": {
+        "columns": ["user_id", "username", "first_name", "max_height", "total_beans",
+                    "games_played", "created_at", "last_played", "active_skin_id"],
+        "key": ["user_id"],
+    },
+    "games": {
+        "columns": ["id", "user_id", "score", "beans_collected", "played_at"],
+        "key": ["id"],
+    },
+    "user_skins": {
+        "columns": ["user_id", "skin_id"],
+        "key": ["user_id", "skin_id"],
+    },
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def parse_cursor(table: str, cursor: str):
+    """
+    Перетворює рядковий курсор на кортеж значень ключа.
+    Для складених ключів значення розділяються двокрапкою: "12345:3".
+    """
+    if cursor is None or cursor == "":
+        return None
+    key = EXPORT_TABLES[table]["key"]
+    parts = cursor.split(":")
+    if len(parts) != len(key):
+        raise ValueError(f"Курсор для {table} має містити {len(key)} значень.")
+    return tuple(int(part) for part in parts)
+
+
+def format_cursor(table: str, row: dict) -> str:
+    """Курсор, з якого можна продовжити експорт після цього рядка."""
+    return ":".join(str(row[column]) for column in EXPORT_TABLES[table]["key"])
+
+
+def _connect_readonly(db_path: str):
+    """З'єднання лише для читання: експорт ніколи не бере блокування на запис."""
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def iter_rows(db_path: str, table: str, after=None, since: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Генератор рядків таблиці (dict) у порядку ключа, починаючи після курсора `after`.
+    `since` фільтрує games за played_at (для інкрементального експорту за часом).
+    Пам'ять — O(chunk_size) незалежно від розміру таблиці.
+    """
+    spec = EXPORT_TABLES[table]
+    columns = ", ".join(spec["columns"])
+    key = spec["key"]
+    key_expr = f"({', '.join(key)})" if len(key) > 1 else key[0]
+    placeholders = f"({', '.join('?' * len(key))})" if len(key) > 1 else "?"
+
+    filters, filter_params = [], []
+    if since and table == "games":
+        filters.append("played_at >= ?")
+        filter_params.append(since)
+
+    while True:
+        conditions = list(filters)
+        params = list(filter_params)
+        if after is not None:
+            conditions.append(f"{key_expr} > {placeholders}")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # Нове з'єднання на кожну порцію: транзакція читання живе мілісекунди
+        conn = _connect_readonly(db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"SELECT {columns} FROM {table} {where} ORDER BY {', '.join(key)} LIMIT ?",
+                (*params, chunk_size)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            yield dict(row)
+
+        if len(rows) < chunk_size:
+            return
+        after = tuple(rows[-1][column] for column in key)
+
+
+def iter_ndjson(rows):
+    """Перетворює рядки на NDJSON (по одному JSON-об'єкту на рядок)."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def iter_csv(rows, columns):
+    """Перетворює рядки на CSV з заголовком, не накопичуючи весь файл у пам'яті."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        # Віддаємо накопичене, коли буфер підріс, щоб не дрібнити запис на рядки
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_export(db_path: str, table: str, fmt: str = "ndjson", after=None, since: str = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Повертає генератор текстових фрагментів експорту у потрібному форматі."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Невідома таблиця: {table}")
+    rows = iter_rows(db_path, table, after=after, since=since, chunk_size=chunk_size)
+    if fmt == "ndjson":
+        return iter_ndjson(rows)
+    if fmt == "csv":
+        return iter_csv(rows, EXPORT_TABLES[table]["columns"])
+    raise ValueError(f"Невідомий формат: {fmt}")
+
+
+def main(argv=None):
+    """Точка входу для командного рядка."""
+    # Не імпортуємо config/database: CLI має працювати без BOT_TOKEN і без ініціалізації БД
+    default_db = os.getenv('DB_PATH', 'perky_jump.db')
+
+    parser = argparse.ArgumentParser(description="Потоковий експорт даних Perky Coffee Jump.")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", dest="fmt", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--after", help="Курсор: експортувати рядки після цього ключа (напр. games.id).")
+    parser.add_argument("--since", help="Лише ігри з played_at >= цього значення (YYYY-MM-DD HH:MM:SS).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--db", default=default_db, help="Шлях до бази даних.")
+    parser.add_argument("--out", help="Файл для запису (за замовчуванням — stdout).")
+    args = parser.parse_args(argv)
+
+    after = parse_cursor(args.table, args.after)
+    rows = iter_rows(args.db, args.table, after=after, since=args.since, chunk_size=args.chunk_size)
+
+    # Запам'ятовуємо останній рядок, щоб видати курсор для наступного інкрементального запуску
+    last_row = {}
+
+    def tracked(rows):
+        for row in rows:
+            last_row["row"] = row
+            yield row
+
+    columns = EXPORT_TABLES[args.table]["columns"]
+    chunks = iter_ndjson(tracked(rows)) if args.fmt == "ndjson" else iter_csv(tracked(rows), columns)
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+    if "row" in last_row:
+        print(f"Наступний курсор: {format_cursor(args.table, last_row['row'])}", file=sys.stderr)
+    else:
+        print("Нових рядків немає.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# live.py: Канал живих оновлень для WebApp через Server-Sent Events.
+# Шлях запису (save_stats, skin_action) лише позначає дані як "брудні";
+# фонова задача раз на LIVE_INTERVAL читає їх з БД один раз і розсилає
+# всім підключеним клієнтам, тож сплеск записів дає не більше одного оновлення за інтервал.
+# Записи з інших воркерів uvicorn помічаємо за версією даних сховища (PRAGMA data_version).
+
+import asyncio
+import json
+import logging
+import time
+
+from admission import run_db
+from config import LIVE_INTERVAL, LIVE_TOP_N, LIVE_HEARTBEAT
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+def _sse_event(event: str, data) -> bytes:
+    """Кодує подію у формат SSE один раз для всіх отримувачів."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+PING = b": ping\n\n"
+
+
+class Subscriber:
+    """
+    Одне SSE-з'єднання. Зберігає лише останнє значення кожного типу подій,
+    тож повільний клієнт отримує свіжий стан, а не чергу застарілих.
+    """
+    __slots__ = ("user_id", "pending", "event")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def offer(self, kind: str, payload: bytes):
+        self.pending[kind] = payload
+        self.event.set()
+
+    async def next_chunks(self):
+        await self.event.wait()
+        self.event.clear()
+        chunks = list(self.pending.values())
+        self.pending.clear()
+        return chunks
+
+
+class LiveHub:
+    """
+    Реєстр підписників і фонова задача, що зливає зміни та розсилає їх.
+    """
+    def __init__(self):
+        self.subscribers = set()
+        self.by_user = {}
+        self.leaderboard_dirty = False
+        self.dirty_users = set()
+        self.leaderboard = None
+        self.leaderboard_payload = None
+        # Останній надісланий stats кожного користувача з підписниками: незмінне не шлемо повторно
+        self.stats_payloads = {}
+        self.data_version = None
+        self._task = None
+
+    # --- Сигнали зі шляху запису ---
+
+    def notify_score(self, user_id: int, score: int):
+        """Викликається після збереження результату гри."""
+        self.dirty_users.add(user_id)
+        # Рейтинг перераховуємо лише якщо результат може потрапити в топ
+        if self.leaderboard is None or len(self.leaderboard) < LIVE_TOP_N \
+                or score >= self.leaderboard[-1]['max_height']:
+            self.leaderboard_dirty = True
+
+    def notify_user(self, user_id: int):
+        """Викликається після зміни балансу чи активного скіна."""
+        self.dirty_users.add(user_id)
+
+    # --- Підписки ---
+
+    async def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self.subscribers.add(subscriber)
+        self.by_user.setdefault(user_id, set()).add(subscriber)
+
+        # Новий клієнт одразу отримує поточний стан
+        if self.leaderboard_payload is None:
+            await self._refresh_leaderboard()
+        if self.leaderboard_payload is not None:
+            subscriber.offer("leaderboard", self.leaderboard_payload)
+        stats = await run_db(db.get_user_stats, user_id)
+        if stats:
+            payload = _sse_event("stats", stats)
+            self.stats_payloads[user_id] = payload
+            subscriber.offer("stats", payload)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        user_subscribers = self.by_user.get(subscriber.user_id)
+        if user_subscribers is not None:
+            user_subscribers.discard(subscriber)
+            if not user_subscribers:
+                del self.by_user[subscriber.user_id]
+                self.stats_payloads.pop(subscriber.user_id, None)
+
+    async def stream(self, user_id: int):
+        """Асинхронний генератор SSE-потоку для одного клієнта."""
+        subscriber = await self.subscribe(user_id)
+        try:
+            # Клієнт перепідключиться сам через LIVE_INTERVAL, якщо з'єднання впаде
+            yield f"retry: {int(LIVE_INTERVAL * 1000)}\n\n".encode("utf-8")
+            while True:
+                for chunk in await subscriber.next_chunks():
+                    yield chunk
+        finally:
+            self.unsubscribe(subscriber)
+
+    # --- Фонова розсилка ---
+
+    async def _refresh_leaderboard(self) -> bool:
+        """Перечитує топ-N; повертає True, якщо він змінився."""
+        leaderboard = await run_db(db.get_leaderboard, LIVE_TOP_N)
+        if leaderboard == self.leaderboard:
+            return False
+        self.leaderboard = leaderboard
+        self.leaderboard_payload = _sse_event("leaderboard", leaderboard)
+        return True
+
+    async def _check_foreign_writes(self):
+        """
+        Порівнює версію даних з попередньою. Якщо вона змінилася, дані міг змінити
+        інший воркер: позначаємо топ і статистику всіх підписаних тут користувачів.
+        """
+        version = await run_db(db.data_version)
+        if version is None:
+            return
+        if self.data_version is not None and version != self.data_version:
+            self.leaderboard_dirty = True
+            self.dirty_users.update(self.by_user)
+        self.data_version = version
+
+    async def _flush(self):
+        if self.leaderboard_dirty:
+            self.leaderboard_dirty = False
+            if self.subscribers and await self._refresh_leaderboard():
+                for subscriber in self.subscribers:
+                    subscriber.offer("leaderboard", self.leaderboard_payload)
+            elif not self.subscribers:
+                # Без слухачів просто скидаємо кеш: перший підписник прочитає свіжий топ
+                self.leaderboard = self.leaderboard_payload = None
+
+        dirty_users, self.dirty_users = self.dirty_users, set()
+        # Статистику читаємо лише для тих, хто слухає саме цей процес, одним пакетом
+        user_ids = [user_id for user_id in dirty_users if user_id in self.by_user]
+        if not user_ids:
+            return
+        for user_id, stats in (await run_db(db.get_users_stats, user_ids)).items():
+            payload = _sse_event("stats", stats)
+            user_subscribers = self.by_user.get(user_id)
+            if not user_subscribers or self.stats_payloads.get(user_id) == payload:
+                continue
+            self.stats_payloads[user_id] = payload
+            for subscriber in user_subscribers:
+                subscriber.offer("stats", payload)
+
+    async def _loop(self):
+        last_ping = time.monotonic()
+        while True:
+            await asyncio.sleep(LIVE_INTERVAL)
+            now = time.monotonic()
+            try:
+                await self._check_foreign_writes()
+                await self._flush()
+            except Exception as e:
+                logger.error(f"Помилка розсилки живих оновлень: {e}")
+            # Один спільний heartbeat замість таймера на кожне з'єднання
+            if now - last_ping >= LIVE_HEARTBEAT:
+                last_ping = now
+                for subscriber in self.subscribers:
+                    subscriber.offer("ping", PING)
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+# Створюємо єдиний екземпляр хабу
+live_hub = LiveHub()
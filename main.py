@@ -8,9 +8,14 @@ from telegram.error import RetryAfter
 import time
 
 # Імпортуємо роутер, конфігурацію та логіку бота
+from admission import AdmissionMiddleware
 from api import router as api_router
+from backup import backup_manager
+from live import live_hub
 from config import BOT_TOKEN
 from bot import perky_bot, setup_bot_handlers
+from database import db
+from notifier import notifier
 
 # Налаштування логера
 logging.basicConfig(
@@ -25,7 +30,13 @@ async def lifespan(app: FastAPI):
     Функція, що виконується при старті та зупинці додатку.
     """
     logger.info("Запуск додатка...")
+    # Сховище створюється тут, а не під час імпорту модулів
+    db.configure()
     await setup_bot_handlers()
+    # Ініціалізуємо додаток один раз: HTTP-клієнт бота спільний для вебхука і розсилок
+    await perky_bot.application.initialize()
+    # start() запускає обробку черги оновлень з BOT_CONCURRENT_UPDATES одночасних обробників
+    await perky_bot.application.start()
 
     try:
         await perky_bot.application.bot.set_webhook(
@@ -39,18 +50,30 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Критична помилка при встановленні вебхука: {e}")
 
+    await notifier.start(perky_bot.application.bot)
+    backup_manager.start()
+    live_hub.start()
+
     yield
 
     logger.info("Зупинка додатка...")
+    await live_hub.stop()
+    await backup_manager.stop()
+    await notifier.stop()
     try:
         await perky_bot.application.bot.delete_webhook()
         logger.info("Вебхук видалено.")
     except Exception as e:
         logger.error(f"Помилка при видаленні вебхука: {e}")
+    await perky_bot.application.stop()
+    await perky_bot.application.shutdown()
 
 # Створюємо FastAPI додаток
 app = FastAPI(lifespan=lifespan, title="Perky Coffee Jump")
 
+# Контроль допуску: обмежує одночасні запити ігрового API і резервує смугу для вебхука
+app.add_middleware(AdmissionMiddleware)
+
 # ВАЖЛИВО: Монтуємо теку "static" для роздачі CSS та JS файлів
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -82,9 +105,9 @@ async def telegram_webhook(request: Request):
         json_data = await request.json()
         update = Update.de_json(json_data, perky_bot.application.bot)
 
-        # Використовуємо асинхронний менеджер контексту для обробки
-        async with perky_bot.application:
-            await perky_bot.application.process_update(update)
+        # Ставимо оновлення в чергу і одразу відповідаємо Telegram;
+        # обробники виконуються паралельно (див. BOT_CONCURRENT_UPDATES)
+        await perky_bot.application.update_queue.put(update)
 
         return {"status": "ok"}
     except Exception as e:
@@ -0,0 +1,247 @@
+# memory_storage.py: Сховище в пам'яті з тією ж поведінкою, що й Database (SQLite).
+# Таблиці — словники та списки, тож тести й бенчмарки працюють без дискового I/O.
+# Значення повертаються в тих самих формах, що й з SQLite (булеві як 0/1, час як рядок).
+
+import logging
+import threading
+from datetime import datetime, timezone
+
+from database import initial_skins
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+USER_COLUMNS = ("user_id", "username", "first_name", "max_height", "total_beans",
+                "games_played", "created_at", "last_played", "active_skin_id")
+
+
+def _now() -> str:
+    """Той самий формат, що й CURRENT_TIMESTAMP у SQLite (UTC)."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class MemoryDatabase(Storage):
+    """Сховище в пам'яті. Потокобезпечне: API звертається до нього з пулу потоків."""
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.users = {}          # user_id -> рядок users
+        self.games = []          # рядки games у порядку id
+        self.skins = []          # рядки skins у порядку id
+        self.user_skins = set()  # (user_id, skin_id)
+        self.idempotency_keys = {}  # idempotency_key -> game_id
+        self._version = 0        # лічильник записів, аналог PRAGMA data_version
+
+        for skin_id, (name, price, is_default, svg_data) in enumerate(initial_skins(), start=1):
+            self.skins.append({
+                "id": skin_id, "name": name, "price": price,
+                "is_default": int(is_default), "svg_data": svg_data,
+            })
+        self._default_skin_id = next(skin["id"] for skin in self.skins if skin["is_default"])
+        logger.info("Сховище в пам'яті ініціалізовано.")
+
+    def _skin(self, skin_id: int):
+        # id скінів послідовні з 1, тож таблиця — просто масив
+        if 1 <= skin_id <= len(self.skins):
+            return self.skins[skin_id - 1]
+        return None
+
+    def _stats_row(self, user: dict) -> dict:
+        stats = {column: user[column] for column in USER_COLUMNS}
+        stats["active_skin"] = self._skin(user["active_skin_id"])["svg_data"]
+        return stats
+
+    def _upsert_user(self, user_id: int, username: str, first_name: str):
+        self._version += 1
+        user = self.users.get(user_id)
+        if user is None:
+            self.users[user_id] = {
+                "user_id": user_id, "username": username, "first_name": first_name,
+                "max_height": 0, "total_beans": 0, "games_played": 0,
+                "created_at": _now(), "last_played": None, "active_skin_id": 1,
+            }
+        else:
+            user["username"] = username
+            user["first_name"] = first_name
+        self.user_skins.add((user_id, self._default_skin_id))
+
+    def _add_game(self, user_id: int, score: int, collected_beans: int) -> int:
+        self._version += 1
+        game_id = len(self.games) + 1
+        self.games.append({
+            "id": game_id, "user_id": user_id, "score": score,
+            "beans_collected": collected_beans, "played_at": _now(),
+        })
+        return game_id
+
+    def _apply_delta(self, user_id: int, max_score: int, beans: int, games: int):
+        user = self.users.get(user_id)
+        if user is None:
+            return
+        user["max_height"] = max(user["max_height"], max_score)
+        user["total_beans"] += beans
+        user["games_played"] += games
+        user["last_played"] = _now()
+
+    # --- Реалізація Storage ---
+
+    def get_user_stats(self, user_id: int):
+        with self._lock:
+            user = self.users.get(user_id)
+            return self._stats_row(user) if user else None
+
+    def get_users_stats(self, user_ids):
+        with self._lock:
+            return {
+                user_id: self._stats_row(self.users[user_id])
+                for user_id in user_ids if user_id in self.users
+            }
+
+    def data_version(self):
+        with self._lock:
+            return self._version
+
+    def save_or_update_user(self, user_id: int, username: str, first_name: str):
+        with self._lock:
+            self._upsert_user(user_id, username, first_name)
+
+    def save_game_result(self, user_id: int, score: int, collected_beans: int):
+        with self._lock:
+            self._add_game(user_id, score, collected_beans)
+            self._apply_delta(user_id, score, collected_beans, 1)
+
+    def save_game_results_batch(self, results):
+        with self._lock:
+            unique = {}
+            for result in results:
+                unique.setdefault(result.idempotency_key, result)
+
+            duplicates = sorted(key for key in unique if key in self.idempotency_keys)
+            new_results = [result for key, result in unique.items() if key not in self.idempotency_keys]
+
+            deltas = {}
+            for result in new_results:
+                delta = deltas.setdefault(result.user_id, {
+                    "username": None, "first_name": None, "max_score": 0, "beans": 0, "games": 0
+                })
+                delta["username"] = result.username
+                delta["first_name"] = result.first_name
+                delta["max_score"] = max(delta["max_score"], result.score)
+                delta["beans"] += result.collected_beans
+                delta["games"] += 1
+
+            old_heights = {user_id: self.users[user_id]["max_height"] for user_id in deltas if user_id in self.users}
+            for user_id, d in deltas.items():
+                self._upsert_user(user_id, d["username"], d["first_name"])
+            for result in new_results:
+                self.idempotency_keys[result.idempotency_key] = self._add_game(
+                    result.user_id, result.score, result.collected_beans
+                )
+
+            records = []
+            for user_id, d in deltas.items():
+                self._apply_delta(user_id, d["max_score"], d["beans"], d["games"])
+                old_height = old_heights.get(user_id, 0)
+                if d["max_score"] > old_height:
+                    records.append({
+                        "user_id": user_id,
+                        "name": d["username"] or d["first_name"],
+                        "old_height": old_height,
+                        "new_height": d["max_score"],
+                    })
+
+            stats = {}
+            for user_id in {result.user_id for result in unique.values()}:
+                if user_id in self.users:
+                    stats[user_id] = self._stats_row(self.users[user_id])
+
+            return {
+                "accepted": [result.idempotency_key for result in new_results],
+                "duplicates": duplicates,
+                "records": records,
+                "stats": stats,
+            }
+
+    def get_game_by_idempotency_key(self, idempotency_key: str):
+        with self._lock:
+            game_id = self.idempotency_keys.get(idempotency_key)
+            if game_id is None:
+                return None
+            game = self.games[game_id - 1]
+            return {key: game[key] for key in ("id", "user_id", "score", "beans_collected")}
+
+    def _ranked_players(self):
+        players = [user for user in self.users.values() if user["games_played"] > 0]
+        players.sort(key=lambda user: (-user["max_height"], user["user_id"]))
+        return players
+
+    def get_leaderboard(self, limit: int = 10):
+        with self._lock:
+            return [
+                {"username": user["username"], "first_name": user["first_name"], "max_height": user["max_height"]}
+                for user in self._ranked_players()[:limit]
+            ]
+
+    def get_overtaken_users(self, user_id: int, old_height: int, new_height: int, limit: int = 20):
+        with self._lock:
+            return [
+                user["user_id"] for user in self._ranked_players()
+                if user["user_id"] != user_id and old_height <= user["max_height"] < new_height
+            ][:limit]
+
+    def get_skins_after(self, skin_id: int):
+        with self._lock:
+            return [
+                {"id": skin["id"], "name": skin["name"], "price": skin["price"]}
+                for skin in self.skins if skin["id"] > skin_id
+            ]
+
+    def get_all_skins(self, user_id: int):
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return []
+            return [
+                {
+                    **skin,
+                    "is_owned": int((user_id, skin["id"]) in self.user_skins),
+                    "is_active": int(skin["id"] == user["active_skin_id"]),
+                }
+                for skin in self.skins
+            ]
+
+    def buy_skin(self, user_id: int, skin_id: int):
+        with self._lock:
+            skin = self._skin(skin_id)
+            if not skin:
+                return {"success": False, "message": "Скін не знайдено."}
+            if skin["is_default"]:
+                return {"success": False, "message": "Дефолтний скін не можна купувати."}
+
+            user = self.users.get(user_id)
+            if not user:
+                return {"success": False, "message": "Користувача не знайдено."}
+            if user["total_beans"] < skin["price"]:
+                return {"success": False, "message": "Недостатньо кавових зерен."}
+            if (user_id, skin_id) in self.user_skins:
+                return {"success": False, "message": "Скін вже куплено."}
+
+            user["total_beans"] -= skin["price"]
+            self.user_skins.add((user_id, skin_id))
+            self._version += 1
+            return {"success": True, "message": "Скін успішно придбано!"}
+
+    def activate_skin(self, user_id: int, skin_id: int):
+        with self._lock:
+            user = self.users.get(user_id)
+            if not user:
+                return {"success": False, "message": "Користувача не знайдено."}
+
+            skin = self._skin(skin_id)
+            if not skin:
+                return {"success": False, "message": "Скін не існує."}
+            if not skin["is_default"] and (user_id, skin_id) not in self.user_skins:
+                return {"success": False, "message": "Скін не належить вам."}
+
+            user["active_skin_id"] = skin_id
+            self._version += 1
+            return {"success": True, "message": "Скін успішно активовано!", "active_skin": skin["svg_data"]}
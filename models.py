@@ -2,7 +2,7 @@
 # Описує, яку структуру даних очікує отримати API.
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class GameStats(BaseModel):
     """
@@ -22,3 +22,16 @@ class SkinAction(BaseModel):
     user_id: int
     skin_id: int
     action_type: str = Field(..., pattern="^(buy|activate)$") # Дозволяє лише 'buy' або 'activate'
+
+class GameResult(GameStats):
+    """
+    Результат одного раунду з офлайн-черги клієнта.
+    idempotency_key генерується в грі, тож повторна відправка не дублює гру.
+    """
+    idempotency_key: str = Field(..., min_length=8, max_length=64)
+
+class GameStatsBatch(BaseModel):
+    """
+    Пакет результатів, накопичених клієнтом (наприклад, без зв'язку).
+    """
+    results: List[GameResult] = Field(..., min_length=1, max_length=100)
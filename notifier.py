@@ -0,0 +1,565 @@
+# notifier.py: Планувальник вихідних повідомлень (розсилки та сповіщення).
+# Черга зберігається в SQLite, тож розсилку можна продовжити після перезапуску.
+# Швидкість обмежується відрами токенів: глобально та окремо для кожного чату.
+
+import asyncio
+import html
+import logging
+import sqlite3
+import time
+from datetime import timedelta
+
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from config import (
+    NOTIFY_GLOBAL_RATE, NOTIFY_CHAT_RATE, NOTIFY_WORKERS,
+    NOTIFY_BATCH_SIZE, NOTIFY_MAX_ATTEMPTS, NOTIFY_RECORD_LIMIT, NOTIFY_RECORD_COOLDOWN,
+    NOTIFY_LEASE_TTL, NOTIFY_CLAIM_TIMEOUT,
+)
+from database import db
+from process_lease import ProcessLease
+from rate_limit import KeyedTokenBuckets, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter.retry_after може бути int або timedelta залежно від версії PTB."""
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class OutboxStore:
+    """
+    Постійна черга повідомлень у SQLite.
+    Кожна розсилка — рядок у notify_jobs, кожен адресат — рядок у notify_messages.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.init_tables()
+
+    def _get_connection(self):
+        """Створює з'єднання з базою даних."""
+        return sqlite3.connect(self.db_path)
+
+    def init_tables(self):
+        """Створює таблиці черги, якщо їх не існує."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notify_jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        status TEXT DEFAULT 'pending',
+                        total INTEGER DEFAULT 0,
+                        sent INTEGER DEFAULT 0,
+                        failed INTEGER DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        finished_at TIMESTAMP
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notify_messages (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        job_id INTEGER NOT NULL,
+                        chat_id INTEGER NOT NULL,
+                        status TEXT DEFAULT 'pending', -- pending / in_flight / sent / failed
+                        attempts INTEGER DEFAULT 0,
+                        not_before REAL DEFAULT 0,
+                        last_error TEXT,
+                        sent_at TIMESTAMP,
+                        claimed_by TEXT,  -- процес, що взяв повідомлення в роботу
+                        claimed_at REAL,
+                        UNIQUE (job_id, chat_id),
+                        FOREIGN KEY (job_id) REFERENCES notify_jobs (id)
+                    )
+                ''')
+                # Таблиці, створені до появи claimed_by/claimed_at
+                columns = {row[1] for row in cursor.execute("PRAGMA table_info(notify_messages)")}
+                for column, column_type in (("claimed_by", "TEXT"), ("claimed_at", "REAL")):
+                    if column not in columns:
+                        cursor.execute(f"ALTER TABLE notify_messages ADD COLUMN {column} {column_type}")
+                # Диспетчер завжди вибирає наступну порцію pending-повідомлень за id
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_notify_messages_status ON notify_messages (status, id)"
+                )
+                # Коли чат востаннє отримав повідомлення певного виду (для обмеження частоти)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notify_cooldowns (
+                        chat_id INTEGER NOT NULL,
+                        kind TEXT NOT NULL,
+                        last_at REAL NOT NULL,
+                        PRIMARY KEY (chat_id, kind)
+                    )
+                ''')
+                # Службові значення (наприклад, останній анонсований скін)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notify_state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT
+                    )
+                ''')
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка при ініціалізації черги повідомлень: {e}")
+
+    def create_job(self, kind: str, text: str, chat_ids=None, cooldown: float = 0):
+        """
+        Створює розсилку. Якщо chat_ids не передано — адресати всі користувачі.
+        З cooldown чати, що вже отримали повідомлення цього виду за останні cooldown секунд,
+        пропускаються. Повертає id розсилки або None, якщо адресатів немає чи сталася помилка.
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                # Перевірка й позначка cooldown мають бути атомарними між воркерами uvicorn
+                cursor.execute("BEGIN IMMEDIATE")
+                if chat_ids is not None and cooldown > 0:
+                    chat_ids = self._take_cooldown(cursor, kind, list(chat_ids), cooldown)
+                    if not chat_ids:
+                        return None
+                cursor.execute("INSERT INTO notify_jobs (kind, text) VALUES (?, ?)", (kind, text))
+                job_id = cursor.lastrowid
+                if chat_ids is None:
+                    # Один INSERT ... SELECT замість 100k окремих вставок
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO notify_messages (job_id, chat_id) SELECT ?, user_id FROM users",
+                        (job_id,)
+                    )
+                else:
+                    cursor.executemany(
+                        "INSERT OR IGNORE INTO notify_messages (job_id, chat_id) VALUES (?, ?)",
+                        [(job_id, chat_id) for chat_id in chat_ids]
+                    )
+                total = cursor.execute(
+                    "SELECT COUNT(*) FROM notify_messages WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                cursor.execute("UPDATE notify_jobs SET total = ? WHERE id = ?", (total, job_id))
+                if total == 0:
+                    cursor.execute(
+                        "UPDATE notify_jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        (job_id,)
+                    )
+                conn.commit()
+                logger.info(f"Створено розсилку #{job_id} ({kind}) на {total} адресатів.")
+                return job_id
+        except sqlite3.Error as e:
+            logger.error(f"Помилка створення розсилки {kind}: {e}")
+            return None
+
+    def _take_cooldown(self, cursor, kind: str, chat_ids, cooldown: float):
+        """Відкидає чати з активним cooldown і позначає решту як щойно сповіщені."""
+        now = time.time()
+        cursor.execute(
+            f"SELECT chat_id FROM notify_cooldowns WHERE kind = ? AND last_at > ? "
+            f"AND chat_id IN ({','.join('?' * len(chat_ids))})",
+            [kind, now - cooldown, *chat_ids]
+        )
+        recent = {row[0] for row in cursor.fetchall()}
+        chat_ids = [chat_id for chat_id in chat_ids if chat_id not in recent]
+        cursor.executemany('''
+            INSERT INTO notify_cooldowns (chat_id, kind, last_at) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id, kind) DO UPDATE SET last_at = excluded.last_at
+        ''', [(chat_id, kind, now) for chat_id in chat_ids])
+        return chat_ids
+
+    def requeue_in_flight(self, owner: str = None, exclude_owner: str = None, claimed_before: float = None):
+        """
+        Повертає у чергу повідомлення, взяті в роботу: власні (owner) під час зупинки
+        або чужі, взяті раніше за claimed_before, — їхній процес, найімовірніше, впав.
+        """
+        conditions, params = ["status = 'in_flight'"], []
+        if owner is not None:
+            conditions.append("claimed_by = ?")
+            params.append(owner)
+        if exclude_owner is not None:
+            conditions.append("(claimed_by IS NULL OR claimed_by != ?)")
+            params.append(exclude_owner)
+        if claimed_before is not None:
+            conditions.append("(claimed_at IS NULL OR claimed_at < ?)")
+            params.append(claimed_before)
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.execute(
+                    f"UPDATE notify_messages SET status = 'pending', claimed_by = NULL, claimed_at = NULL "
+                    f"WHERE {' AND '.join(conditions)}",
+                    params
+                )
+                conn.commit()
+                if cursor.rowcount:
+                    logger.info(f"Повернуто в чергу {cursor.rowcount} повідомлень.")
+        except sqlite3.Error as e:
+            logger.error(f"Помилка відновлення черги повідомлень: {e}")
+
+    def claim_batch(self, limit: int, owner: str):
+        """
+        Забирає наступну порцію повідомлень у роботу (status -> in_flight) для процесу owner.
+        Вибірка й позначка виконуються в одній транзакції BEGIN IMMEDIATE, а UPDATE
+        перевіряє status = 'pending', тож одне повідомлення не може взяти два процеси.
+        Повертає список кортежів (message_id, job_id, chat_id, text, attempts).
+        """
+        try:
+            conn = self._get_connection()
+            try:
+                conn.isolation_level = None
+                conn.execute("BEGIN IMMEDIATE")
+                now = time.time()
+                rows = conn.execute('''
+                    SELECT m.id, m.job_id, m.chat_id, j.text, m.attempts
+                    FROM notify_messages m
+                    JOIN notify_jobs j ON j.id = m.job_id
+                    WHERE m.status = 'pending' AND m.not_before <= ?
+                    ORDER BY m.id
+                    LIMIT ?
+                ''', (now, limit)).fetchall()
+                claimed = []
+                for row in rows:
+                    cursor = conn.execute(
+                        "UPDATE notify_messages SET status = 'in_flight', claimed_by = ?, claimed_at = ? "
+                        "WHERE id = ? AND status = 'pending'",
+                        (owner, now, row[0])
+                    )
+                    if cursor.rowcount == 1:
+                        claimed.append(row)
+                conn.executemany(
+                    "UPDATE notify_jobs SET status = 'running' WHERE id = ? AND status = 'pending'",
+                    [(job_id,) for job_id in {row[1] for row in claimed}]
+                )
+                conn.execute("COMMIT")
+                return claimed
+            finally:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка вибірки повідомлень з черги: {e}")
+            return []
+
+    def record_results(self, sent, failed, retried):
+        """
+        Записує результати відправки однією транзакцією.
+        sent: [(message_id, job_id)], failed: [(message_id, job_id, error)],
+        retried: [(message_id, attempts, not_before, error)].
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE notify_messages SET status = 'sent', sent_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    [(message_id,) for message_id, _ in sent]
+                )
+                cursor.executemany(
+                    "UPDATE notify_messages SET status = 'failed', last_error = ? WHERE id = ?",
+                    [(error, message_id) for message_id, _, error in failed]
+                )
+                cursor.executemany(
+                    "UPDATE notify_messages SET status = 'pending', attempts = ?, not_before = ?, last_error = ?, "
+                    "claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+                    [(attempts, not_before, error, message_id) for message_id, attempts, not_before, error in retried]
+                )
+
+                # Лічильники розсилок оновлюємо агрегатно, а не підрахунком усіх рядків
+                deltas = {}
+                for _, job_id in sent:
+                    deltas.setdefault(job_id, [0, 0])[0] += 1
+                for _, job_id, _ in failed:
+                    deltas.setdefault(job_id, [0, 0])[1] += 1
+                cursor.executemany(
+                    "UPDATE notify_jobs SET sent = sent + ?, failed = failed + ? WHERE id = ?",
+                    [(s, f, job_id) for job_id, (s, f) in deltas.items()]
+                )
+                cursor.executemany('''
+                    UPDATE notify_jobs SET status = 'done', finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND sent + failed >= total
+                ''', [(job_id,) for job_id in deltas])
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка запису результатів розсилки: {e}")
+
+    def get_job(self, job_id: int):
+        """Повертає стан розсилки (прогрес)."""
+        try:
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                row = conn.execute("SELECT * FROM notify_jobs WHERE id = ?", (job_id,)).fetchone()
+                return dict(row) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Помилка отримання розсилки #{job_id}: {e}")
+            return None
+
+    def get_state(self, key: str):
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute("SELECT value FROM notify_state WHERE key = ?", (key,)).fetchone()
+                return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Помилка читання стану {key}: {e}")
+            return None
+
+    def set_state(self, key: str, value: str):
+        try:
+            with self._get_connection() as conn:
+                conn.execute('''
+                    INSERT INTO notify_state (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''', (key, value))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка запису стану {key}: {e}")
+
+
+class Notifier:
+    """
+    Відправник повідомлень поверх perky_bot.application.bot.
+
+    Диспетчер забирає з OutboxStore порції повідомлень, кілька воркерів
+    паралельно відправляють їх з урахуванням глобального та per-chat лімітів,
+    а результати пишуться в базу пачками.
+
+    Диспетчер працює лише в процесі, що тримає оренду "notifier": глобальний ліміт
+    NOTIFY_GLOBAL_RATE діє на весь застосунок, а не на кожен воркер uvicorn.
+    Усі звернення до SQLite виконуються в потоках, щоб не блокувати event loop вебхука.
+    """
+    def __init__(self, store: OutboxStore = None):
+        self._store = store
+        self.bot = None
+        self.global_bucket = TokenBucket(NOTIFY_GLOBAL_RATE)
+        self.chat_buckets = KeyedTokenBuckets(NOTIFY_CHAT_RATE, capacity=1)
+        self._queue = None
+        self._tasks = []
+        self._wakeup = None
+        self._loop = None
+        self._paused_until = 0.0
+        self._lease = None
+        self._is_leader = False
+        # Накопичені результати: (sent, failed, retried), див. OutboxStore.record_results
+        self._results = ([], [], [])
+
+    @property
+    def store(self):
+        """
+        Черга створюється при першому зверненні в тій самій БД, що й основне сховище.
+        Для сховища без файлу (STORAGE_BACKEND=memory) розсилки вимкнено.
+        """
+        if self._store is None and db.db_path:
+            self._store = OutboxStore(db.db_path)
+        return self._store
+
+    # --- Постановка в чергу ---
+
+    def broadcast(self, text: str, chat_ids=None, kind: str = "broadcast", cooldown: float = 0):
+        """Ставить розсилку в чергу. Без chat_ids — всім користувачам. cooldown див. OutboxStore.create_job."""
+        if self.store is None:
+            return None
+        job_id = self.store.create_job(kind, text, chat_ids, cooldown)
+        if job_id and self._loop:
+            # Може викликатися з потоку пулу БД, тож будимо диспетчер потокобезпечно
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job_id
+
+    def get_job(self, job_id: int):
+        """Стан розсилки для оператора або None."""
+        if self.store is None:
+            return None
+        return self.store.get_job(job_id)
+
+    def notify_record_beaten(self, user_id: int, name: str, old_height: int, new_height: int):
+        """
+        Сповіщає гравців, чий рекорд щойно побив user_id.
+        Перша гра нового гравця (old_height == 0) не рахується: інакше кожен новачок
+        "обганяв" би всіх з найнижчими рекордами. Кожен чат отримує таке сповіщення
+        не частіше, ніж раз на NOTIFY_RECORD_COOLDOWN.
+        """
+        if old_height <= 0:
+            return None
+        overtaken = db.get_overtaken_users(user_id, old_height, new_height, limit=NOTIFY_RECORD_LIMIT)
+        if not overtaken:
+            return None
+        text = (
+            f"🏆 <b>{html.escape(name or 'Гравець')}</b> щойно побив ваш рекорд, піднявшись на <b>{new_height} м</b>!\n\n"
+            "Час відігратися! 🚀"
+        )
+        return self.broadcast(text, chat_ids=overtaken, kind="record", cooldown=NOTIFY_RECORD_COOLDOWN)
+
+    def announce_new_skins(self):
+        """
+        Анонсує скіни, що з'явилися в таблиці skins після останнього анонсу.
+        Під час першого запуску лише запам'ятовує поточний стан.
+        """
+        if self.store is None:
+            return None
+        last_id = self.store.get_state("last_announced_skin_id")
+        skins = db.get_skins_after(int(last_id or 0))
+        if not skins:
+            return None
+        self.store.set_state("last_announced_skin_id", str(max(skin['id'] for skin in skins)))
+        if last_id is None:
+            return None
+
+        names = ", ".join(f"<b>{html.escape(skin['name'])}</b>" for skin in skins)
+        text = f"🤖 У магазині нові скіни: {names}!\n\nЗазирніть у гру, щоб придбати їх за кавові зерна ☕"
+        return self.broadcast(text, kind="new_skin")
+
+    # --- Життєвий цикл ---
+
+    async def start(self, bot):
+        """Запускає диспетчер, воркери та запис результатів."""
+        if self.store is None:
+            logger.info("Сховище без файлу БД — планувальник повідомлень вимкнено.")
+            return
+        self.bot = bot
+        self._queue = asyncio.Queue(maxsize=NOTIFY_BATCH_SIZE * 2)
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._lease = await asyncio.to_thread(ProcessLease, self.store.db_path, "notifier", NOTIFY_LEASE_TTL)
+        self._is_leader = False
+
+        self._tasks = [
+            asyncio.create_task(self._lease_loop()),
+            asyncio.create_task(self._dispatch_loop()),
+            asyncio.create_task(self._flush_loop()),
+        ]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(NOTIFY_WORKERS)]
+        logger.info(f"Планувальник повідомлень запущено ({NOTIFY_WORKERS} воркерів, {NOTIFY_GLOBAL_RATE} повідомлень/с).")
+
+    async def stop(self):
+        """
+        Зупиняє відправку: нові порції не вибираються, ще не відправлені повертаються в чергу,
+        а повідомлення, що вже відправляються, отримують кілька секунд, щоб не надіслати їх двічі.
+        """
+        if not self._tasks:
+            return
+        background, workers = self._tasks[:3], self._tasks[3:]
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning("Не всі повідомлення встигли відправитися до зупинки.")
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        await self._flush_results()
+        await asyncio.to_thread(self.store.requeue_in_flight, owner=self._lease.owner)
+        if self._is_leader:
+            await asyncio.to_thread(self._lease.release)
+            self._is_leader = False
+        logger.info("Планувальник повідомлень зупинено.")
+
+    async def _lease_loop(self):
+        """
+        Тримає оренду диспетчера: продовжує її втричі частіше, ніж вона спливає.
+        Диспетчер на кожному кроці перевіряє нові скіни, тож скін, доданий без перезапуску,
+        анонсується протягом NOTIFY_LEASE_TTL / 3 секунд.
+        """
+        while True:
+            await self._renew_lease()
+            if self._is_leader:
+                # Анонс робить лише диспетчер, інакше кожен воркер створив би власну розсилку
+                await asyncio.to_thread(self.announce_new_skins)
+            await asyncio.sleep(NOTIFY_LEASE_TTL / 3)
+
+    async def _renew_lease(self):
+        """Захоплює або продовжує оренду диспетчера; новий власник підхоплює покинуту роботу."""
+        was_leader = self._is_leader
+        self._is_leader = await asyncio.to_thread(self._lease.try_acquire)
+        if self._is_leader and not was_leader:
+            logger.info("Цей процес став диспетчером розсилок.")
+        elif was_leader and not self._is_leader:
+            logger.warning("Оренду диспетчера розсилок втрачено.")
+        if self._is_leader:
+            # Повідомлення, взяті процесом, що впав, повертаються в чергу після NOTIFY_CLAIM_TIMEOUT
+            await asyncio.to_thread(
+                self.store.requeue_in_flight,
+                exclude_owner=self._lease.owner, claimed_before=time.time() - NOTIFY_CLAIM_TIMEOUT
+            )
+
+    async def _dispatch_loop(self):
+        """Підкачує порції повідомлень з бази в локальну чергу воркерів."""
+        while True:
+            if not self._is_leader:
+                await asyncio.sleep(1)
+                continue
+
+            # Не вибираємо нову порцію, доки воркери не розібрали половину попередньої
+            if self._queue.qsize() > NOTIFY_BATCH_SIZE:
+                await asyncio.sleep(0.1)
+                continue
+
+            rows = await asyncio.to_thread(self.store.claim_batch, NOTIFY_BATCH_SIZE, self._lease.owner)
+            for row in rows:
+                await self._queue.put(row)
+
+            if not rows:
+                self._wakeup.clear()
+                try:
+                    # Нових розсилок немає — чекаємо на сигнал або на відкладені повтори
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _flush_loop(self):
+        """Періодично записує накопичені результати відправки."""
+        while True:
+            await asyncio.sleep(1)
+            await self._flush_results()
+
+    async def _flush_results(self):
+        sent, failed, retried = self._results
+        if sent or failed or retried:
+            self._results = ([], [], [])
+            await asyncio.to_thread(self.store.record_results, sent, failed, retried)
+
+    async def _worker(self):
+        while True:
+            message_id, job_id, chat_id, text, attempts = await self._queue.get()
+            try:
+                await self._send(message_id, job_id, chat_id, text, attempts)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, message_id: int, job_id: int, chat_id: int, text: str, attempts: int):
+        """Відправляє одне повідомлення з урахуванням лімітів та помилок Bot API."""
+        while True:
+            # Після RetryAfter мовчать усі воркери, а не лише той, що отримав помилку
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.global_bucket.acquire()
+            await self.chat_buckets.acquire(chat_id)
+            if self._paused_until <= time.monotonic():
+                break
+
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.HTML)
+            self._results[0].append((message_id, job_id))
+        except RetryAfter as e:
+            retry_after = _retry_after_seconds(e)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logger.warning(f"Telegram flood control: пауза розсилки на {retry_after} секунд.")
+            # Спроба не зараховується: ліміт — наша проблема, а не адресата
+            self._results[2].append((message_id, attempts, time.time() + retry_after, str(e)))
+        except (Forbidden, BadRequest) as e:
+            # Користувач заблокував бота або чат не існує — повтор не допоможе
+            self._results[1].append((message_id, job_id, str(e)))
+        except TelegramError as e:
+            # Мережеві збої та таймаути — повтор з експоненційною затримкою
+            attempts += 1
+            if attempts >= NOTIFY_MAX_ATTEMPTS:
+                self._results[1].append((message_id, job_id, str(e)))
+            else:
+                self._results[2].append((message_id, attempts, time.time() + 2 ** attempts, str(e)))
+
+# Створюємо єдиний екземпляр планувальника
+notifier = Notifier()
@@ -0,0 +1,93 @@
+# process_lease.py: Оренда (lease) фонової ролі між процесами застосунку.
+# Railway запускає кілька воркерів uvicorn з однією БД; фонові цикли (розсилки, бекапи)
+# мають працювати лише в одному з них. Оренда зберігається в SQLite і має термін дії,
+# тож якщо власник впаде, роль перейде до іншого процесу після закінчення терміну.
+
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def _new_owner_id() -> str:
+    """Унікальний ідентифікатор процесу: хост, pid і випадковий суфікс (pid повторюються між контейнерами)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ProcessLease:
+    """
+    Іменована оренда в таблиці process_leases.
+    try_acquire() захоплює вільну або прострочену оренду чи продовжує власну;
+    викликати її треба частіше, ніж раз на ttl секунд.
+    """
+    def __init__(self, db_path: str, name: str, ttl: float = 30.0):
+        self.db_path = db_path
+        self.name = name
+        self.ttl = ttl
+        self.owner = _new_owner_id()
+        self.init_tables()
+
+    def _get_connection(self):
+        """З'єднання в режимі autocommit: транзакціями керуємо явно через BEGIN IMMEDIATE."""
+        return sqlite3.connect(self.db_path, isolation_level=None, timeout=10)
+
+    def init_tables(self):
+        """Створює таблицю оренд, якщо її не існує."""
+        try:
+            conn = self._get_connection()
+            try:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS process_leases (
+                        name TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка ініціалізації таблиці оренд: {e}")
+
+    def try_acquire(self) -> bool:
+        """Повертає True, якщо цей процес тримає оренду (щойно захопив або продовжив)."""
+        now = time.time()
+        try:
+            conn = self._get_connection()
+            try:
+                # BEGIN IMMEDIATE бере блокування на запис одразу: перевірка і захоплення атомарні
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT owner, expires_at FROM process_leases WHERE name = ?", (self.name,)
+                ).fetchone()
+                held = row is None or row[0] == self.owner or row[1] <= now
+                if held:
+                    conn.execute('''
+                        INSERT INTO process_leases (name, owner, expires_at) VALUES (?, ?, ?)
+                        ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                    ''', (self.name, self.owner, now + self.ttl))
+                conn.execute("COMMIT")
+                return held
+            finally:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка захоплення оренди {self.name}: {e}")
+            return False
+
+    def release(self):
+        """Звільняє оренду, якщо вона належить цьому процесу, щоб інший міг взяти її одразу."""
+        try:
+            conn = self._get_connection()
+            try:
+                conn.execute(
+                    "DELETE FROM process_leases WHERE name = ? AND owner = ?", (self.name, self.owner)
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка звільнення оренди {self.name}: {e}")
@@ -0,0 +1,90 @@
+# rate_limit.py: Відра токенів (token bucket) для обмеження швидкості.
+# Використовується для пейсингу вихідних повідомлень бота.
+
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """
+    Класичне відро токенів: `rate` токенів за секунду, не більше `capacity` у запасі.
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        """Доливає токени пропорційно часу, що минув."""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Пробує забрати токени без очікування.
+        Повертає 0, якщо вдалося, інакше — скільки секунд треба почекати.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def refund(self, tokens: float = 1.0):
+        """Повертає забрані токени (наприклад, якщо запит усе одно відхилено)."""
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Чекає, доки в відрі не з'являться потрібні токени, і забирає їх."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    def is_full(self) -> bool:
+        """Чи відро повне (тобто його можна безпечно забути)."""
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class KeyedTokenBuckets:
+    """
+    Набір відер, по одному на ключ (chat_id, user_id...).
+    Кількість відер обмежена: найдавніше використані витісняються першими.
+    """
+    def __init__(self, rate: float, capacity: float = None, max_keys: int = 100_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def get(self, key) -> TokenBucket:
+        """Повертає відро для ключа, створюючи його за потреби."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key, tokens: float = 1.0) -> float:
+        return self.get(key).try_acquire(tokens)
+
+    def refund(self, key, tokens: float = 1.0):
+        self.get(key).refund(tokens)
+
+    async def acquire(self, key, tokens: float = 1.0):
+        await self.get(key).acquire(tokens)
+
+    def __len__(self):
+        return len(self._buckets)
@@ -51,6 +51,7 @@ let currentHeight = 0, currentCoffeeCount = 0, gameMode = 'classic', gameSpeedMu
 let animationId;
 let keys = {}, touchControls = { left: false, right: false }, gyroTilt = 0;
 let INITIAL_PLAYER_Y; // ДОДАНО: Для коректного розрахунку висоти
+let liveSource = null, liveLeaderboard = null; // Живий канал оновлень та останній отриманий рейтинг
 
 
 // Статистика гравця
@@ -118,12 +119,14 @@ function gameLoop() {
 
 // --- ОНОВЛЕННЯ СТАНУ ---
 function update() {
+    if (telemetry) telemetry.frame++;
     updatePlayer();
     updatePlatforms();
     updateEnemies(); 
     updateCamera();
     updateParticles();
     checkCollisions();
+    recordTelemetrySample();
     
     if (player.y > camera.y + canvas.height || (gameMode === 'timed' && gameTimer <= 0)) endGame();
 }
@@ -211,6 +214,7 @@ function checkCollisions() {
             player.y + player.height > enemy.y) {
             
             playSound('hit_enemy');
+            recordTelemetryHit();
             endGame(); // Гра завершується при зіткненні
             return false;
         }
@@ -237,6 +241,7 @@ function checkCollisions() {
         if (currentHeight >= 500) beanValue = 3; 
 
         currentCoffeeCount += beansCollectedThisFrame.length * beanValue;
+        recordTelemetryBeans(beansCollectedThisFrame.length);
         updateGameUI();
     }
 }
@@ -395,19 +400,26 @@ function startGame(mode) {
     
     platforms = []; coffees = []; particles = []; clouds = []; enemies = []; // ІНІЦІАЛІЗАЦІЯ ВОРОГІВ
     currentHeight = 0; currentCoffeeCount = 0;
+    startTelemetry(mode);
     
     // --- ЛОГІКА РЕЖИМІВ ГРИ ---
     if (mode === 'timed') {
         gameSpeedMultiplier = 2; // Прискорення x2 для "На час"
-        gameTimer = 60; // ВИПРАВЛЕНО: Ініціалізація таймера
+        gameTimer = TIMED_MODE_SECONDS; // ВИПРАВЛЕНО: Ініціалізація таймера
+        // Залишок рахуємо від часу активної гри, а не тиками інтервалу: тик, перерваний паузою,
+        // інакше додавав би до секунди гри, і кілька пауз виводили б раунд за ліміт сервера
         const timerInterval = setInterval(() => {
-            if (gameState !== 'playing') clearInterval(timerInterval);
-            gameTimer--;
+            if (gameState === 'paused') return; // На паузі час раунду не йде
+            if (gameState !== 'playing') {
+                clearInterval(timerInterval);
+                return;
+            }
+            gameTimer = Math.max(0, TIMED_MODE_SECONDS - Math.floor(activePlayMs() / 1000));
             if (gameTimer <= 0) {
                 clearInterval(timerInterval);
-                if (gameState === 'playing') endGame();
+                endGame();
             }
-        }, 1000);
+        }, 250);
     } else if (mode === 'extreme') {
         gameSpeedMultiplier = 3; // Прискорення x3 для "Екстремальний"
     }
@@ -468,27 +480,273 @@ async function endGame() {
     
     checkBonuses();
 }
-async function saveStatsOnServer() {
-    if (!playerStats.user_id) return;
+// --- ОФЛАЙН-ЧЕРГА РЕЗУЛЬТАТІВ ---
+// Результати спершу потрапляють у localStorage, а потім відправляються пакетами.
+// Ключ ідемпотентності не дає серверу зберегти одну гру двічі при повторній відправці.
+const RESULTS_QUEUE_KEY = 'perky_pending_results';
+// Кожен результат коштує токен ліміту на гравця: не більше SAVE_STATS_BURST (5) за пакет
+const RESULTS_BATCH_SIZE = 5;
+const RESULTS_QUEUE_LIMIT = 500;
+let resultsFlushPromise = null, resultsRetryTimer = null, resultsRetryDelay = 5000;
+
+function isValidQueuedResult(item) {
+    // Ті самі обмеження, що й у моделі GameResult на сервері
+    return item && Number.isInteger(item.user_id) && Number.isInteger(item.score)
+        && Number.isInteger(item.collected_beans)
+        && typeof item.idempotency_key === 'string'
+        && item.idempotency_key.length >= 8 && item.idempotency_key.length <= 64
+        && (item.username == null || typeof item.username === 'string')
+        && (item.first_name == null || typeof item.first_name === 'string');
+}
+function loadResultsQueue() {
     try {
-        const response = await fetch('/save_stats', {
+        const queue = JSON.parse(localStorage.getItem(RESULTS_QUEUE_KEY)) || [];
+        return Array.isArray(queue) ? queue.filter(isValidQueuedResult) : [];
+    } catch (error) { return []; }
+}
+function storeResultsQueue(queue) {
+    try {
+        localStorage.setItem(RESULTS_QUEUE_KEY, JSON.stringify(queue.slice(-RESULTS_QUEUE_LIMIT)));
+    } catch (error) { console.error("Не вдалося зберегти чергу результатів:", error); }
+}
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+function enqueueResult(result) {
+    const item = { ...result, idempotency_key: newIdempotencyKey() };
+    if (!isValidQueuedResult(item)) {
+        console.error("Некоректний результат не додано в чергу:", item);
+        return null;
+    }
+    const queue = loadResultsQueue();
+    queue.push(item);
+    storeResultsQueue(queue);
+    return item.idempotency_key;
+}
+function scheduleResultsRetry(retryAfterMs) {
+    if (resultsRetryTimer) return;
+    resultsRetryTimer = setTimeout(() => {
+        resultsRetryTimer = null;
+        flushResultsQueue();
+    }, retryAfterMs || resultsRetryDelay);
+    // На 429 сервер сам каже, коли повторити; збільшуємо паузу лише для збоїв
+    if (!retryAfterMs) resultsRetryDelay = Math.min(resultsRetryDelay * 2, 5 * 60 * 1000);
+}
+function flushResultsQueue() {
+    // Одночасно працює лише одна відправка; решта викликів чекають на неї
+    if (!resultsFlushPromise) {
+        resultsFlushPromise = sendQueuedResults().then(sendQueuedTelemetry).finally(() => { resultsFlushPromise = null; });
+    }
+    return resultsFlushPromise;
+}
+async function postResults(batch) {
+    // Повертає Response або null, якщо немає зв'язку
+    try {
+        return await fetch('/save_stats_batch', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                user_id: playerStats.user_id,
-                username: playerStats.username,
-                first_name: playerStats.first_name,
-                score: Math.floor(currentHeight),
-                collected_beans: currentCoffeeCount
-            })
+            body: JSON.stringify({ results: batch })
         });
-        const data = await response.json();
-        if (data.success) {
-            playerStats = { ...playerStats, ...data.stats };
-            updateRecordsDisplay();
-            if (data.stats.active_skin) playerStats.active_skin = data.stats.active_skin; 
+    } catch (error) {
+        console.error("Немає зв'язку, результати залишаються в черзі:", error);
+        return null;
+    }
+}
+async function acceptedKeys(response) {
+    // Ключі збережених (або вже відомих серверу) результатів; оновлює статистику гравця
+    const data = await response.json();
+    const stats = data.stats[playerStats.user_id];
+    if (stats) {
+        playerStats = { ...playerStats, ...stats };
+        updateRecordsDisplay();
+    }
+    return [...data.accepted, ...data.duplicates];
+}
+function retryLater(response) {
+    if (response && response.status === 429) {
+        // Ліміт на гравця: наступна частина черги піде, щойно відро наповниться
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+        scheduleResultsRetry(retryAfter > 0 ? retryAfter * 1000 : undefined);
+    } else {
+        // Немає зв'язку або 503/5xx — спробуємо пізніше
+        scheduleResultsRetry();
+    }
+}
+async function sendQueuedResults() {
+    while (navigator.onLine !== false) {
+        const batch = loadResultsQueue().slice(0, RESULTS_BATCH_SIZE);
+        if (batch.length === 0) return;
+
+        const response = await postResults(batch);
+        if (!response || (!response.ok && response.status !== 422)) {
+            retryLater(response);
+            return;
+        }
+
+        const done = new Set();
+        let stopped = false;
+        if (response.ok) {
+            (await acceptedKeys(response)).forEach(key => done.add(key));
+        } else {
+            // 422: шукаємо некоректні результати по одному й відкидаємо лише їх,
+            // щоб один зіпсований запис не забрав із собою решту пакета
+            for (const item of batch) {
+                const single = await postResults([item]);
+                if (single && single.ok) {
+                    (await acceptedKeys(single)).forEach(key => done.add(key));
+                } else if (single && single.status === 422) {
+                    console.error("Сервер відхилив результат як некоректний:", item);
+                    done.add(item.idempotency_key);
+                } else {
+                    retryLater(single);
+                    stopped = true;
+                    break;
+                }
+            }
+        }
+
+        storeResultsQueue(loadResultsQueue().filter(item => !done.has(item.idempotency_key)));
+        if (stopped) return;
+        resultsRetryDelay = 5000;
+    }
+}
+async function saveStatsOnServer() {
+    const telemetryData = finishTelemetry();
+    if (!playerStats.user_id) return;
+    const idempotencyKey = enqueueResult({
+        user_id: playerStats.user_id,
+        username: playerStats.username,
+        first_name: playerStats.first_name,
+        score: Math.floor(currentHeight),
+        collected_beans: currentCoffeeCount
+    });
+    if (telemetryData && idempotencyKey) enqueueTelemetry(idempotencyKey, telemetryData);
+    await flushResultsQueue();
+}
+// --- ТЕЛЕМЕТРІЯ РАУНДУ ---
+// Висота кожні TELEMETRY_SAMPLE_FRAMES кадрів, збори зерен і зіткнення пишуться стовпцями
+// і кодуються у varint-дельти (формат описано в telemetry.py). Раунд займає кілька сотень байтів.
+// Пакет відправляється після того, як сервер прийняв результат з тим самим ключем ідемпотентності.
+const TELEMETRY_QUEUE_KEY = 'perky_pending_telemetry';
+const TELEMETRY_QUEUE_LIMIT = 50;
+const TELEMETRY_SAMPLE_FRAMES = 15;
+const TIMED_MODE_SECONDS = 60;
+const TELEMETRY_MODES = { classic: 0, timed: 1, extreme: 2, night: 3 };
+let telemetry = null;
+
+function startTelemetry(mode) {
+    telemetry = {
+        mode, frame: 0, activeMs: 0, resumedAt: performance.now(),
+        heights: [], beanFrames: [], beanCounts: [], hitFrames: []
+    };
+}
+// Тривалість раунду — лише активна гра, без часу на паузі.
+// Той самий годинник веде таймер режиму "На час", тож duration_ms збігається з таймером.
+function activePlayMs() {
+    if (!telemetry) return 0;
+    const running = telemetry.resumedAt === null ? 0 : performance.now() - telemetry.resumedAt;
+    return telemetry.activeMs + running;
+}
+function pauseTelemetry() {
+    if (!telemetry || telemetry.resumedAt === null) return;
+    telemetry.activeMs += performance.now() - telemetry.resumedAt;
+    telemetry.resumedAt = null;
+}
+function resumeTelemetry() {
+    if (telemetry) telemetry.resumedAt = performance.now();
+}
+function recordTelemetrySample() {
+    if (telemetry && telemetry.frame % TELEMETRY_SAMPLE_FRAMES === 0) telemetry.heights.push(currentHeight);
+}
+function recordTelemetryBeans(count) {
+    if (!telemetry) return;
+    telemetry.beanFrames.push(telemetry.frame);
+    telemetry.beanCounts.push(count);
+}
+function recordTelemetryHit() {
+    if (telemetry) telemetry.hitFrames.push(telemetry.frame);
+}
+function finishTelemetry() {
+    if (!telemetry) return null;
+    pauseTelemetry();
+    const finished = telemetry;
+    telemetry = null;
+    // Зіткнення з ворогом завершує гру посеред кадру, до recordTelemetrySample():
+    // дописуємо пропущену вибірку, щоб їх було рівно frame / TELEMETRY_SAMPLE_FRAMES + 1
+    while (finished.heights.length < Math.floor(finished.frame / TELEMETRY_SAMPLE_FRAMES)) {
+        finished.heights.push(Math.floor(currentHeight));
+    }
+    finished.heights.push(Math.floor(currentHeight));
+    return encodeTelemetry(finished);
+}
+function encodeTelemetry(t) {
+    const bytes = [0x50, 0x54, 1, TELEMETRY_MODES[t.mode] || 0]; // "PT", версія, режим
+    const varint = (value) => {
+        let n = Math.max(0, Math.floor(value));
+        while (n >= 0x80) {
+            bytes.push((n % 0x80) | 0x80);
+            n = Math.floor(n / 0x80);
+        }
+        bytes.push(n);
+    };
+    const deltas = (values) => {
+        let previous = 0;
+        values.forEach(value => { varint(value - previous); previous = value; });
+    };
+    varint(TELEMETRY_SAMPLE_FRAMES);
+    varint(t.frame);
+    varint(t.activeMs);
+    varint(t.heights.length); deltas(t.heights);
+    varint(t.beanFrames.length); deltas(t.beanFrames); t.beanCounts.forEach(varint);
+    varint(t.hitFrames.length); deltas(t.hitFrames);
+
+    // localStorage зберігає лише рядки
+    let binary = '';
+    bytes.forEach(byte => { binary += String.fromCharCode(byte); });
+    return btoa(binary);
+}
+function loadTelemetryQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(TELEMETRY_QUEUE_KEY)) || [];
+    } catch (error) { return []; }
+}
+function storeTelemetryQueue(queue) {
+    try {
+        localStorage.setItem(TELEMETRY_QUEUE_KEY, JSON.stringify(queue.slice(-TELEMETRY_QUEUE_LIMIT)));
+    } catch (error) { console.error("Не вдалося зберегти чергу телеметрії:", error); }
+}
+function enqueueTelemetry(idempotencyKey, data) {
+    const queue = loadTelemetryQueue();
+    queue.push({ idempotency_key: idempotencyKey, data });
+    storeTelemetryQueue(queue);
+}
+async function sendQueuedTelemetry() {
+    // Телеметрія гри, чий результат ще в черзі, чекає: без рядка games сервер її не прийме
+    const pendingResults = new Set(loadResultsQueue().map(item => item.idempotency_key));
+    const ready = loadTelemetryQueue().filter(item => !pendingResults.has(item.idempotency_key));
+    const done = new Set();
+
+    for (const item of ready) {
+        if (navigator.onLine === false) break;
+        let response;
+        try {
+            response = await fetch(`/telemetry/${encodeURIComponent(item.idempotency_key)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: Uint8Array.from(atob(item.data), char => char.charCodeAt(0))
+            });
+        } catch (error) {
+            break;
         }
-    } catch (error) { console.error("Помилка збереження статистики:", error); }
+        // 429/503/5xx — повторимо разом із наступною відправкою результатів; інші відповіді остаточні
+        if (response.status === 429 || response.status >= 500) break;
+        done.add(item.idempotency_key);
+    }
+
+    if (done.size > 0) {
+        storeTelemetryQueue(loadTelemetryQueue().filter(item => !done.has(item.idempotency_key)));
+    }
 }
 function checkBonuses() {
     let bonusData = null;
@@ -635,6 +893,7 @@ function pauseGame() {
     if (gameState !== 'playing') return;
     gameState = 'paused';
     cancelAnimationFrame(animationId);
+    pauseTelemetry();
     controls.style.display = 'none';
     pauseBtn.style.display = 'none';
     document.getElementById('pauseScreen').style.display = 'flex'; // Показати екран паузи
@@ -643,6 +902,7 @@ function pauseGame() {
 function resumeGame() {
     if (gameState !== 'paused') return;
     gameState = 'playing';
+    resumeTelemetry();
     document.getElementById('pauseScreen').style.display = 'none'; // Приховати екран паузи
     controls.style.display = (gameSettings.gyro ? 'none' : 'flex');
     pauseBtn.style.display = 'block';
@@ -760,26 +1020,55 @@ function updateStatsDisplayInMenu() {
         <div>🎮 Ігор зіграно: <span>${playerStats.games_played}</span></div>
         <div>🤖 Активний скін: <span>${playerStats.active_skin.replace('.svg', '') || 'default'}</span></div>`;
 }
+function renderLeaderboard(leaderboard) {
+    const content = document.getElementById('leaderboardContent');
+    if (leaderboard.length > 0) {
+        const emojis = ["🥇", "🥈", "🥉"];
+        content.innerHTML = leaderboard.map((user, i) => {
+            const name = user.username || user.first_name || "Гравець";
+            const emoji = emojis[i] || `<b>${i + 1}.</b>`;
+            return `<div class="leaderboard-item">${emoji} ${name} - ${user.max_height} м</div>`;
+        }).join('');
+    } else {
+        content.innerHTML = '<p>Рейтинг поки порожній.</p>';
+    }
+}
 async function loadLeaderboard() {
+    // Якщо живий канал підключений, рейтинг уже актуальний — запит не потрібен
+    if (liveLeaderboard) {
+        renderLeaderboard(liveLeaderboard);
+        return;
+    }
     const content = document.getElementById('leaderboardContent');
     content.innerHTML = '<p>Завантаження...</p>';
     try {
         const response = await fetch('/leaderboard');
         const data = await response.json();
-        if (data.success && data.leaderboard.length > 0) {
-            const emojis = ["🥇", "🥈", "🥉"];
-            content.innerHTML = data.leaderboard.map((user, i) => {
-                const name = user.username || user.first_name || "Гравець";
-                const emoji = emojis[i] || `<b>${i + 1}.</b>`;
-                return `<div class="leaderboard-item">${emoji} ${name} - ${user.max_height} м</div>`;
-            }).join('');
-        } else {
-            content.innerHTML = '<p>Рейтинг поки порожній.</p>';
-        }
+        renderLeaderboard(data.success ? data.leaderboard : []);
     } catch (error) { 
         content.innerHTML = '<p>Не вдалося завантажити рейтинг.</p>'; 
     }
 }
+// --- ЖИВІ ОНОВЛЕННЯ (SSE) ---
+function connectLiveUpdates() {
+    if (!playerStats.user_id || !window.EventSource) return;
+    liveSource = new EventSource(`/live/${playerStats.user_id}`);
+
+    liveSource.addEventListener('leaderboard', e => {
+        liveLeaderboard = JSON.parse(e.data);
+        if (gameState === 'menu') renderLeaderboard(liveLeaderboard);
+    });
+    liveSource.addEventListener('stats', e => {
+        const stats = JSON.parse(e.data);
+        playerStats = { ...playerStats, ...stats };
+        updateRecordsDisplay();
+        if (gameState === 'menu') updateStatsDisplayInMenu();
+        const userTotalBeansEl = document.getElementById('userTotalBeans');
+        if (userTotalBeansEl) userTotalBeansEl.textContent = playerStats.total_beans;
+    });
+    // Поки з'єднання відновлюється, повертаємось до звичайних запитів
+    liveSource.addEventListener('error', () => { liveLeaderboard = null; });
+}
 // --- НОВА ФУНКЦІОНАЛЬНІСТЬ МАГАЗИНУ ---
 
 async function loadShop() {
@@ -954,6 +1243,11 @@ async function initializeApp() {
     // ОНОВЛЕНО: Завантаження контенту вкладки "Гра" при запуску
     updateStatsDisplayInMenu(); 
     loadLeaderboard(); 
+    connectLiveUpdates();
+
+    // Досилаємо результати, що залишилися з попередніх сесій, і при відновленні зв'язку
+    window.addEventListener('online', flushResultsQueue);
+    flushResultsQueue();
     
     // 5. ПРИХОВУЄМО LOADER ТА ПОКАЗУЄМО МЕНЮ
     if (loadingScreen) {
@@ -0,0 +1,97 @@
+# storage.py: Інтерфейс сховища даних гри та лінивий доступ до нього.
+# Реалізації: Database (SQLite, database.py) та MemoryDatabase (в пам'яті, memory_storage.py).
+
+import threading
+from abc import ABC, abstractmethod
+
+
+class Storage(ABC):
+    """
+    Спільний інтерфейс сховища: користувачі, статистика, рейтинг і скіни.
+    Обидві реалізації мають повертати однакові дані для однакових викликів.
+    """
+    # Шлях до файлу БД; None для сховищ без файлу (експорт, бекапи та розсилки недоступні)
+    db_path = None
+
+    @abstractmethod
+    def get_user_stats(self, user_id: int):
+        """Статистика користувача з активним скіном або None."""
+
+    @abstractmethod
+    def get_users_stats(self, user_ids):
+        """Статистика кількох користувачів: словник user_id -> статистика (відсутні пропускаються)."""
+
+    @abstractmethod
+    def data_version(self):
+        """
+        Число, що змінюється після кожного запису в сховище, зокрема з інших процесів.
+        Дозволяє дешево помітити чужі записи без перечитування даних.
+        """
+
+    @abstractmethod
+    def save_or_update_user(self, user_id: int, username: str, first_name: str):
+        """Створює користувача або оновлює його ім'я."""
+
+    @abstractmethod
+    def save_game_result(self, user_id: int, score: int, collected_beans: int):
+        """Зберігає результат гри та оновлює загальну статистику."""
+
+    @abstractmethod
+    def save_game_results_batch(self, results):
+        """Зберігає пакет результатів з ключами ідемпотентності."""
+
+    @abstractmethod
+    def get_game_by_idempotency_key(self, idempotency_key: str):
+        """Гра (id, user_id, score, beans_collected), збережена з цим ключем, або None."""
+
+    @abstractmethod
+    def get_leaderboard(self, limit: int = 10):
+        """Топ гравців за максимальною висотою."""
+
+    @abstractmethod
+    def get_overtaken_users(self, user_id: int, old_height: int, new_height: int, limit: int = 20):
+        """ID гравців, чий рекорд лежить у [old_height, new_height)."""
+
+    @abstractmethod
+    def get_skins_after(self, skin_id: int):
+        """Скіни з id більшим за skin_id."""
+
+    @abstractmethod
+    def get_all_skins(self, user_id: int):
+        """Всі скіни з позначками is_owned / is_active для користувача."""
+
+    @abstractmethod
+    def buy_skin(self, user_id: int, skin_id: int):
+        """Купівля скіна за кавові зерна."""
+
+    @abstractmethod
+    def activate_skin(self, user_id: int, skin_id: int):
+        """Активація купленого або дефолтного скіна."""
+
+
+class LazyStorage:
+    """
+    Замінник глобального `db`: сховище створюється при першому зверненні
+    (або явно в lifespan через configure), а не під час імпорту модуля.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Storage:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._factory()
+        return self._engine
+
+    def configure(self, engine: Storage = None) -> Storage:
+        """Встановлює готове сховище або створює його з налаштувань."""
+        with self._lock:
+            self._engine = engine if engine is not None else self._factory()
+        return self._engine
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
@@ -0,0 +1,317 @@
+# telemetry.py: Телеметрія ігрових раундів — бінарний формат, перевірка правдоподібності та зберігання.
+# Гра надсилає раунд одним компактним бінарним пакетом (формат описано нижче),
+# сервер розбирає його за один прохід, порівнює з заявленими score/collected_beans
+# і зберігає стиснутим blob, прив'язаним до рядка games.
+#
+# Розпакування збережених сесій для аналізу:
+#   python telemetry.py --after 1500 --out sessions.ndjson
+#   python telemetry.py --implausible > suspicious.ndjson
+
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+import sys
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Формат пакета (версія 1). Усі числа — беззнакові varint (LEB128), стовпці йдуть підряд:
+#   b"PT", версія (1 байт), режим (1 байт)
+#   sample_frames, frames, duration_ms
+#   n_heights, висоти дельтами від попередньої (висота лише росте)
+#   n_beans, кадри зборів зерен дельтами, кількість зерен за кадр
+#   n_hits, кадри зіткнень з ворогами дельтами
+# Висота записується кожні sample_frames кадрів і ще раз наприкінці раунду.
+# duration_ms — час активної гри без пауз.
+TELEMETRY_MAGIC = b"PT"
+TELEMETRY_VERSION = 1
+
+# Коди режимів (кнопки data-mode) та множник швидкості кожного режиму, як у static/script.js
+GAME_MODES = ("classic", "timed", "extreme", "night")
+MODE_SPEED = {"classic": 1, "timed": 2, "extreme": 3, "night": 1}
+
+# Фізика гри: найсильніший стрибок (bouncy) — 22·√множник пікселів за кадр, 100 пікселів = 1 метр
+BOUNCY_JUMP = 22
+PIXELS_PER_METER = 100
+# Режим "На час" триває 60 с активної гри: гра рахує таймер тим самим годинником, що й duration_ms,
+# тож паузи його не подовжують; запас на крок таймера (250 мс) і кадр до завершення гри
+TIMED_MODE_MAX_MS = 65_000
+
+MAX_SAMPLE_FRAMES = 600
+DEFAULT_CHUNK_SIZE = 500
+
+
+class TelemetryError(ValueError):
+    """Пакет телеметрії пошкоджений або не відповідає формату."""
+
+
+def _read_varint(data: bytes, pos: int):
+    """Читає varint з позиції pos; повертає (значення, нова позиція)."""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise TelemetryError("Пакет обірвано.")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 35:
+            raise TelemetryError("Завелике число у пакеті.")
+
+
+def _read_column(data: bytes, pos: int, count: int, cumulative: bool):
+    values = []
+    total = 0
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        if cumulative:
+            total += value
+            value = total
+        values.append(value)
+    return values, pos
+
+
+def _read_count(data: bytes, pos: int):
+    # Кожен елемент займає хоча б байт, тож довжина стовпця не може перевищувати залишок пакета
+    count, pos = _read_varint(data, pos)
+    if count > len(data) - pos:
+        raise TelemetryError("Довжина стовпця більша за пакет.")
+    return count, pos
+
+
+def decode_session(data: bytes) -> dict:
+    """
+    Розбирає пакет телеметрії у стовпці з абсолютними значеннями.
+    Кидає TelemetryError, якщо пакет не відповідає формату.
+    Складність — O(len(data)), тож перевірка дешева навіть до звернення до БД.
+    """
+    if len(data) < 4 or data[:2] != TELEMETRY_MAGIC:
+        raise TelemetryError("Невідомий формат телеметрії.")
+    if data[2] != TELEMETRY_VERSION:
+        raise TelemetryError(f"Непідтримувана версія телеметрії: {data[2]}.")
+    if data[3] >= len(GAME_MODES):
+        raise TelemetryError("Невідомий режим гри.")
+
+    pos = 4
+    sample_frames, pos = _read_varint(data, pos)
+    frames, pos = _read_varint(data, pos)
+    duration_ms, pos = _read_varint(data, pos)
+    if not 1 <= sample_frames <= MAX_SAMPLE_FRAMES:
+        raise TelemetryError("Некоректний інтервал вибірки.")
+
+    n_heights, pos = _read_count(data, pos)
+    heights, pos = _read_column(data, pos, n_heights, cumulative=True)
+    n_beans, pos = _read_count(data, pos)
+    bean_frames, pos = _read_column(data, pos, n_beans, cumulative=True)
+    bean_counts, pos = _read_column(data, pos, n_beans, cumulative=False)
+    n_hits, pos = _read_count(data, pos)
+    hit_frames, pos = _read_column(data, pos, n_hits, cumulative=True)
+
+    if pos != len(data):
+        raise TelemetryError("Зайві байти в кінці пакета.")
+    # Вибірка кожні sample_frames кадрів плюс фінальна — кількість висот задана кадрами
+    if n_heights != frames // sample_frames + 1:
+        raise TelemetryError("Кількість вибірок висоти не відповідає тривалості раунду.")
+    if (bean_frames and bean_frames[-1] > frames) or (hit_frames and hit_frames[-1] > frames):
+        raise TelemetryError("Подія після завершення раунду.")
+
+    return {
+        "mode": GAME_MODES[data[3]],
+        "sample_frames": sample_frames,
+        "frames": frames,
+        "duration_ms": duration_ms,
+        "heights": heights,
+        "bean_frames": bean_frames,
+        "bean_counts": bean_counts,
+        "hit_frames": hit_frames,
+    }
+
+
+def _bean_value(height: int) -> int:
+    """Вартість зерна на висоті, як у checkCollisions() гри."""
+    if height >= 500:
+        return 3
+    if height >= 200:
+        return 2
+    return 1
+
+
+def check_plausibility(session: dict, score: int, collected_beans: int) -> list:
+    """
+    Порівнює телеметрію з заявленим результатом. Повертає список порушень
+    (порожній, якщо результат правдоподібний):
+      score    — фінальна висота телеметрії не збігається з score;
+      climb    — між вибірками висота росте швидше, ніж дозволяє найсильніший стрибок;
+      beans    — collected_beans не вкладається у вартість зібраних зерен на їхній висоті;
+      hits     — більше одного зіткнення (гра завершується на першому);
+      duration — раунд "На час" довший за таймер.
+    """
+    flags = []
+    heights = session["heights"]
+    step = session["sample_frames"]
+    frames = session["frames"]
+
+    if heights[-1] != score:
+        flags.append("score")
+
+    # Максимальний підйом за кадр; +1 м запасу на округлення висоти та "прилипання" до платформи
+    climb_per_frame = BOUNCY_JUMP * math.sqrt(MODE_SPEED[session["mode"]]) / PIXELS_PER_METER
+    previous_height, previous_frame = 0, 0
+    for i, height in enumerate(heights):
+        frame = frames if i == len(heights) - 1 else (i + 1) * step
+        if height - previous_height > math.ceil((frame - previous_frame) * climb_per_frame) + 1:
+            flags.append("climb")
+            break
+        previous_height, previous_frame = height, frame
+
+    # Висота в момент збору лежить між найближчими вибірками до та після кадру збору
+    min_beans = max_beans = 0
+    for frame, count in zip(session["bean_frames"], session["bean_counts"]):
+        before = frame // step - 1
+        after = min(-(-frame // step) - 1, len(heights) - 1)
+        min_beans += count * _bean_value(heights[before] if before >= 0 else 0)
+        max_beans += count * _bean_value(heights[max(after, 0)])
+    if not min_beans <= collected_beans <= max_beans:
+        flags.append("beans")
+
+    if len(session["hit_frames"]) > 1:
+        flags.append("hits")
+    if session["mode"] == "timed" and session["duration_ms"] > TIMED_MODE_MAX_MS:
+        flags.append("duration")
+
+    return flags
+
+
+class TelemetryStore:
+    """
+    Сховище телеметрії в SQLite: один рядок game_telemetry на гру.
+    Підсумки (висота, зерна, правдоподібність) лежать у звичайних стовпцях для фільтрації,
+    а самі стовпці раунду — у стиснутому blob у тому ж форматі, що й пакет від гри.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.init_tables()
+
+    def _get_connection(self):
+        """Створює з'єднання з базою даних."""
+        return sqlite3.connect(self.db_path)
+
+    def init_tables(self):
+        """Створює таблицю телеметрії, якщо її не існує."""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS game_telemetry (
+                        game_id INTEGER PRIMARY KEY,
+                        user_id INTEGER NOT NULL,
+                        mode TEXT NOT NULL,
+                        frames INTEGER NOT NULL,
+                        duration_ms INTEGER NOT NULL,
+                        max_height INTEGER NOT NULL,
+                        bean_pickups INTEGER NOT NULL,
+                        enemy_hits INTEGER NOT NULL,
+                        plausible INTEGER NOT NULL,
+                        flags TEXT,
+                        data BLOB NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (game_id) REFERENCES games (id)
+                    )
+                ''')
+                # Пошук підозрілих раундів без повного сканування
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_game_telemetry_plausible ON game_telemetry (plausible, game_id)"
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Помилка ініціалізації таблиці телеметрії: {e}")
+
+    def save(self, game: dict, payload: bytes, session: dict, flags: list) -> bool:
+        """
+        Зберігає телеметрію гри. Повертає False, якщо телеметрія для цієї гри вже є
+        (повторна відправка з офлайн-черги) — перший запис не перезаписується.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO game_telemetry
+                    (game_id, user_id, mode, frames, duration_ms, max_height, bean_pickups, enemy_hits,
+                     plausible, flags, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                game["id"], game["user_id"], session["mode"], session["frames"], session["duration_ms"],
+                session["heights"][-1], sum(session["bean_counts"]), len(session["hit_frames"]),
+                int(not flags), ",".join(flags) or None, zlib.compress(payload, 9),
+            ))
+            conn.commit()
+            return cursor.rowcount == 1
+
+
+def iter_sessions(db_path: str, after: int = None, implausible_only: bool = False,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Генератор розпакованих сесій у порядку game_id, починаючи після `after`.
+    Як і export.iter_rows, читає порціями у коротких транзакціях лише для читання.
+    """
+    condition = "t.plausible = 0 AND t.game_id > ?" if implausible_only else "t.game_id > ?"
+    after = after or 0
+    while True:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f'''
+                SELECT t.game_id, t.user_id, g.score, g.beans_collected, t.plausible, t.flags,
+                       t.created_at, t.data
+                FROM game_telemetry t JOIN games g ON g.id = t.game_id
+                WHERE {condition}
+                ORDER BY t.game_id LIMIT ?
+            ''', (after, chunk_size)).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            session = dict(row)
+            session["flags"] = session["flags"].split(",") if session["flags"] else []
+            session.update(decode_session(zlib.decompress(session.pop("data"))))
+            yield session
+
+        if len(rows) < chunk_size:
+            return
+        after = rows[-1]["game_id"]
+
+
+def main(argv=None):
+    """Точка входу для командного рядка: вивантажує сесії у NDJSON."""
+    # Як і export.py, не імпортуємо config/database: CLI працює без BOT_TOKEN
+    parser = argparse.ArgumentParser(description="Розпакування телеметрії раундів Perky Coffee Jump.")
+    parser.add_argument("--after", type=int, help="Курсор: сесії з game_id більшим за цей.")
+    parser.add_argument("--implausible", action="store_true", help="Лише неправдоподібні раунди.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--db", default=os.getenv('DB_PATH', 'perky_jump.db'), help="Шлях до бази даних.")
+    parser.add_argument("--out", help="Файл для запису (за замовчуванням — stdout).")
+    args = parser.parse_args(argv)
+
+    last_game_id = None
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for session in iter_sessions(args.db, after=args.after, implausible_only=args.implausible,
+                                     chunk_size=args.chunk_size):
+            out.write(json.dumps(session, ensure_ascii=False) + "\n")
+            last_game_id = session["game_id"]
+    finally:
+        if args.out:
+            out.close()
+
+    if last_game_id is not None:
+        print(f"Наступний курсор: {last_game_id}", file=sys.stderr)
+    else:
+        print("Нових сесій немає.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
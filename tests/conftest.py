@@ -0,0 +1,10 @@
+# conftest.py: Спільні налаштування тестів.
+import os
+import sys
+
+# config.py вимагає ці змінні; тестам вони не потрібні
+os.environ.setdefault("BOT_TOKEN", "0:test")
+os.environ.setdefault("WEBAPP_URL", "http://localhost")
+
+# Модулі проєкту лежать у корені репозиторію
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,253 @@
+# test_storage_conformance.py: Спільні тести поведінки сховищ.
+# Кожен тест проганяється на Database (SQLite) та MemoryDatabase: обидві реалізації
+# Storage мають поводитися однаково.
+
+import pytest
+
+from database import Database
+from memory_storage import MemoryDatabase
+from models import GameResult
+
+SKIN_COUNT = 12
+DEFAULT_SKIN_ID = 1
+CHEAPEST_SKIN_ID = 2  # Skin #1, 550 зерен
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def storage(request, tmp_path):
+    if request.param == "sqlite":
+        return Database(str(tmp_path / "test.db"))
+    return MemoryDatabase()
+
+
+def make_player(storage, user_id, score=0, beans=0, name=None):
+    storage.save_or_update_user(user_id, name or f"user{user_id}", f"Name {user_id}")
+    if score or beans:
+        storage.save_game_result(user_id, score, beans)
+
+
+def result(key, user_id=1, score=100, beans=5):
+    return GameResult(user_id=user_id, username=f"user{user_id}", score=score,
+                      collected_beans=beans, idempotency_key=key)
+
+
+# --- Статистика ---
+
+def test_stats_of_missing_user_is_none(storage):
+    assert storage.get_user_stats(42) is None
+
+
+def test_new_user_has_zero_stats_and_default_skin(storage):
+    storage.save_or_update_user(1, "alice", "Alice")
+    stats = storage.get_user_stats(1)
+    assert stats["username"] == "alice"
+    assert stats["first_name"] == "Alice"
+    assert (stats["max_height"], stats["total_beans"], stats["games_played"]) == (0, 0, 0)
+    assert stats["active_skin_id"] == DEFAULT_SKIN_ID
+    assert stats["active_skin"] == "default_robot.svg"
+    assert stats["last_played"] is None
+
+
+def test_save_or_update_user_renames_without_resetting_stats(storage):
+    make_player(storage, 1, score=300, beans=7)
+    storage.save_or_update_user(1, "renamed", "Renamed")
+    stats = storage.get_user_stats(1)
+    assert stats["username"] == "renamed"
+    assert (stats["max_height"], stats["total_beans"], stats["games_played"]) == (300, 7, 1)
+
+
+def test_game_results_accumulate(storage):
+    make_player(storage, 1)
+    storage.save_game_result(1, 300, 10)
+    storage.save_game_result(1, 200, 5)
+    stats = storage.get_user_stats(1)
+    assert (stats["max_height"], stats["total_beans"], stats["games_played"]) == (300, 15, 2)
+    assert stats["last_played"] is not None
+
+
+def test_game_of_unknown_user_does_not_create_user(storage):
+    storage.save_game_result(99, 100, 1)
+    assert storage.get_user_stats(99) is None
+
+
+def test_users_stats_match_single_reads_and_skip_missing(storage):
+    make_player(storage, 1, score=100, beans=3)
+    make_player(storage, 2)
+    stats = storage.get_users_stats([1, 2, 99])
+    assert stats == {1: storage.get_user_stats(1), 2: storage.get_user_stats(2)}
+    assert storage.get_users_stats([]) == {}
+
+
+def test_data_version_changes_after_writes(storage):
+    version = storage.data_version()
+    assert storage.data_version() == version
+    make_player(storage, 1, score=100, beans=1000)
+    after_game = storage.data_version()
+    assert after_game != version
+    assert storage.buy_skin(1, CHEAPEST_SKIN_ID)["success"]
+    after_purchase = storage.data_version()
+    assert after_purchase != after_game
+    assert storage.activate_skin(1, CHEAPEST_SKIN_ID)["success"]
+    assert storage.data_version() != after_purchase
+
+
+def test_data_version_sees_writes_from_another_instance(tmp_path):
+    # Два екземпляри над одним файлом — як два воркери uvicorn
+    path = str(tmp_path / "shared.db")
+    reader, writer = Database(path), Database(path)
+    version = reader.data_version()
+    make_player(writer, 1, score=100)
+    assert reader.data_version() != version
+
+
+# --- Рейтинг ---
+
+def test_leaderboard_orders_by_height_then_user_id(storage):
+    make_player(storage, 3, score=500)
+    make_player(storage, 1, score=500)
+    make_player(storage, 2, score=900)
+    make_player(storage, 4, score=100)
+    heights = [(row["username"], row["max_height"]) for row in storage.get_leaderboard()]
+    assert heights == [("user2", 900), ("user1", 500), ("user3", 500), ("user4", 100)]
+
+
+def test_leaderboard_skips_players_without_games_and_respects_limit(storage):
+    make_player(storage, 1)
+    for user_id in range(2, 8):
+        make_player(storage, user_id, score=user_id * 10)
+    leaderboard = storage.get_leaderboard(3)
+    assert [row["username"] for row in leaderboard] == ["user7", "user6", "user5"]
+    assert set(leaderboard[0]) == {"username", "first_name", "max_height"}
+
+
+def test_overtaken_users_range_is_half_open(storage):
+    make_player(storage, 1, score=50)
+    make_player(storage, 2, score=100)   # == old_height: обійдений
+    make_player(storage, 3, score=150)
+    make_player(storage, 4, score=200)   # == new_height: не обійдений
+    make_player(storage, 5, score=250)
+    assert storage.get_overtaken_users(1, 100, 200) == [3, 2]
+
+
+def test_overtaken_users_excludes_self_and_players_without_games(storage):
+    make_player(storage, 1, score=150)
+    make_player(storage, 2)
+    make_player(storage, 3, score=120)
+    assert storage.get_overtaken_users(1, 0, 200) == [3]
+
+
+def test_overtaken_users_ties_and_limit(storage):
+    for user_id in (5, 2, 9):
+        make_player(storage, user_id, score=100)
+    make_player(storage, 7, score=150)
+    assert storage.get_overtaken_users(1, 100, 200, limit=3) == [7, 2, 5]
+    assert storage.get_overtaken_users(1, 100, 100) == []
+
+
+# --- Скіни ---
+
+def test_all_skins_for_new_user(storage):
+    make_player(storage, 1)
+    skins = storage.get_all_skins(1)
+    assert [skin["id"] for skin in skins] == list(range(1, SKIN_COUNT + 1))
+    assert [(skin["is_owned"], skin["is_active"]) for skin in skins[:2]] == [(1, 1), (0, 0)]
+
+
+def test_all_skins_for_missing_user_is_empty(storage):
+    assert storage.get_all_skins(42) == []
+
+
+def test_skins_after(storage):
+    assert [skin["id"] for skin in storage.get_skins_after(10)] == [11, 12]
+    assert storage.get_skins_after(SKIN_COUNT) == []
+
+
+@pytest.mark.parametrize("user_id, skin_id, message", [
+    (1, 999, "Скін не знайдено."),
+    (1, DEFAULT_SKIN_ID, "Дефолтний скін не можна купувати."),
+    (42, CHEAPEST_SKIN_ID, "Користувача не знайдено."),
+    (1, CHEAPEST_SKIN_ID, "Недостатньо кавових зерен."),
+])
+def test_buy_skin_errors(storage, user_id, skin_id, message):
+    make_player(storage, 1, beans=549)
+    assert storage.buy_skin(user_id, skin_id) == {"success": False, "message": message}
+    assert storage.get_user_stats(1)["total_beans"] == 549
+
+
+def test_buy_skin_charges_once(storage):
+    make_player(storage, 1, beans=1200)
+    assert storage.buy_skin(1, CHEAPEST_SKIN_ID)["success"] is True
+    assert storage.buy_skin(1, CHEAPEST_SKIN_ID) == {"success": False, "message": "Скін вже куплено."}
+    assert storage.get_user_stats(1)["total_beans"] == 650
+    assert storage.get_all_skins(1)[CHEAPEST_SKIN_ID - 1]["is_owned"] == 1
+
+
+@pytest.mark.parametrize("user_id, skin_id, message", [
+    (42, DEFAULT_SKIN_ID, "Користувача не знайдено."),
+    (1, 999, "Скін не існує."),
+    (1, CHEAPEST_SKIN_ID, "Скін не належить вам."),
+])
+def test_activate_skin_errors(storage, user_id, skin_id, message):
+    make_player(storage, 1)
+    assert storage.activate_skin(user_id, skin_id) == {"success": False, "message": message}
+    assert storage.get_user_stats(1)["active_skin_id"] == DEFAULT_SKIN_ID
+
+
+def test_activate_owned_and_default_skin(storage):
+    make_player(storage, 1, beans=600)
+    storage.buy_skin(1, CHEAPEST_SKIN_ID)
+    activated = storage.activate_skin(1, CHEAPEST_SKIN_ID)
+    assert activated["success"] is True
+    assert activated["active_skin"] == "skin_1.svg"
+    assert storage.get_user_stats(1)["active_skin"] == "skin_1.svg"
+    assert storage.activate_skin(1, DEFAULT_SKIN_ID)["active_skin"] == "default_robot.svg"
+
+
+# --- Пакети з ключами ідемпотентності ---
+
+def test_batch_duplicates_inside_one_batch_are_saved_once(storage):
+    outcome = storage.save_game_results_batch([
+        result("key-0001", score=100, beans=5),
+        result("key-0001", score=999, beans=99),
+        result("key-0002", score=200, beans=3),
+    ])
+    assert outcome["accepted"] == ["key-0001", "key-0002"]
+    assert outcome["duplicates"] == []
+    stats = storage.get_user_stats(1)
+    assert (stats["max_height"], stats["total_beans"], stats["games_played"]) == (200, 8, 2)
+    assert outcome["stats"][1]["games_played"] == 2
+
+
+def test_batch_keys_seen_in_earlier_batch_are_duplicates(storage):
+    storage.save_game_results_batch([result("key-0001"), result("key-0002")])
+    outcome = storage.save_game_results_batch([result("key-0002"), result("key-0003", beans=1)])
+    assert outcome["accepted"] == ["key-0003"]
+    assert outcome["duplicates"] == ["key-0002"]
+    assert outcome["records"] == []
+    stats = storage.get_user_stats(1)
+    assert (stats["total_beans"], stats["games_played"]) == (11, 3)
+
+
+def test_batch_creates_users_and_reports_records(storage):
+    make_player(storage, 2, score=300)
+    outcome = storage.save_game_results_batch([
+        result("key-0001", user_id=1, score=100),
+        result("key-0002", user_id=2, score=250),
+        result("key-0003", user_id=2, score=400),
+    ])
+    assert storage.get_user_stats(1)["username"] == "user1"
+    records = sorted(outcome["records"], key=lambda record: record["user_id"])
+    assert records == [
+        {"user_id": 1, "name": "user1", "old_height": 0, "new_height": 100},
+        {"user_id": 2, "name": "user2", "old_height": 300, "new_height": 400},
+    ]
+
+
+def test_game_by_idempotency_key(storage):
+    storage.save_game_result(1, 10, 1)  # гра без ключа зсуває id
+    storage.save_game_results_batch([result("key-0001", score=100, beans=5),
+                                      result("key-0002", user_id=2, score=200, beans=3)])
+    assert storage.get_game_by_idempotency_key("key-0002") == {
+        "id": 3, "user_id": 2, "score": 200, "beans_collected": 3
+    }
+    assert storage.get_game_by_idempotency_key("key-missing") is None
@@ -0,0 +1,216 @@
+# test_telemetry.py: Розбір пакетів телеметрії та перевірка правдоподібності.
+# Пакети будуються так само, як їх записує та кодує static/script.js
+# (update() -> recordTelemetry*(), finishTelemetry(), encodeTelemetry()).
+
+import pytest
+
+from telemetry import (
+    GAME_MODES, TELEMETRY_VERSION, TIMED_MODE_MAX_MS,
+    TelemetryError, _bean_value, check_plausibility, decode_session,
+)
+
+SAMPLE_FRAMES = 15  # TELEMETRY_SAMPLE_FRAMES у грі
+
+
+def _varint(out: bytearray, value: int):
+    value = max(0, int(value))
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode(mode, frames, duration_ms, heights, bean_frames=(), bean_counts=(), hit_frames=(),
+           sample_frames=SAMPLE_FRAMES):
+    """Те саме, що encodeTelemetry() у грі: заголовок, varint-и, стовпці дельтами."""
+    out = bytearray(b"PT")
+    out += bytes([TELEMETRY_VERSION, GAME_MODES.index(mode)])
+    for value in (sample_frames, frames, duration_ms):
+        _varint(out, value)
+    for column, counts in ((heights, None), (bean_frames, bean_counts), (hit_frames, None)):
+        _varint(out, len(column))
+        previous = 0
+        for value in column:
+            _varint(out, value - previous)
+            previous = value
+        for count in counts or ():
+            _varint(out, count)
+    return bytes(out)
+
+
+def play(frames, height_at, beans=None, hit=False, mode="classic", duration_ms=None):
+    """
+    Проганяє раунд кадр за кадром, як update() у грі: frame++, зіткнення з ворогом,
+    збір зерен, вибірка висоти на кадрах, кратних SAMPLE_FRAMES. Зіткнення на кадрі
+    frames завершує гру до вибірки, і finishTelemetry() дописує пропущену.
+    Повертає (пакет, score, collected_beans).
+    """
+    beans = beans or {}
+    heights, bean_frames, bean_counts, hit_frames = [], [], [], []
+    collected = 0
+    for frame in range(1, frames + 1):
+        height = height_at(frame)
+        if hit and frame == frames:
+            hit_frames.append(frame)
+            break
+        if frame in beans:
+            bean_frames.append(frame)
+            bean_counts.append(beans[frame])
+            collected += beans[frame] * _bean_value(height)
+        if frame % SAMPLE_FRAMES == 0:
+            heights.append(height)
+    score = height_at(frames)
+    while len(heights) < frames // SAMPLE_FRAMES:
+        heights.append(score)
+    heights.append(score)
+    if duration_ms is None:
+        duration_ms = frames * 1000 // 60
+    payload = encode(mode, frames, duration_ms, heights, bean_frames, bean_counts, hit_frames)
+    return payload, score, collected
+
+
+def climb(frame):
+    """Рівний підйом 0,2 м за кадр — трохи повільніше за найсильніший стрибок."""
+    return frame // 5
+
+
+# --- Чесні раунди ---
+
+@pytest.mark.parametrize("frames", [1, 14, 15, 16, 100, 450])
+def test_round_ended_by_fall_is_plausible(frames):
+    payload, score, beans = play(frames, climb)
+    session = decode_session(payload)
+    assert len(session["heights"]) == frames // SAMPLE_FRAMES + 1
+    assert check_plausibility(session, score, beans) == []
+
+
+@pytest.mark.parametrize("frames", [44, 45, 46, 60, 61])
+def test_enemy_hit_on_any_frame_is_plausible(frames):
+    # На кадрі, кратному 15, зіткнення забирає саме вибірку цього кадру
+    payload, score, beans = play(frames, climb, beans={10: 1}, hit=True)
+    session = decode_session(payload)
+    assert session["hit_frames"] == [frames]
+    assert len(session["heights"]) == frames // SAMPLE_FRAMES + 1
+    assert check_plausibility(session, score, beans) == []
+
+
+def test_bean_on_sample_frame_uses_height_of_that_sample():
+    # Кадр 1005 кратний 15: зерно зібрано на висоті вибірки цього ж кадру (201 м, 2 за зерно),
+    # тож обидві межі точні, хоча на попередній вибірці (990, 198 м) зерно коштувало 1
+    payload, score, beans = play(1010, climb, beans={1005: 3})
+    session = decode_session(payload)
+    assert beans == 6
+    assert check_plausibility(session, score, beans) == []
+    assert check_plausibility(session, score, 3) == ["beans"]
+    assert check_plausibility(session, score, 7) == ["beans"]
+
+
+def test_bean_between_samples_allows_both_neighbour_values():
+    # Кадр 1000 між вибірками 990 (198 м) і 1005 (201 м): вартість 1 або 2 за зерно
+    payload, score, _ = play(1010, climb, beans={1000: 3})
+    session = decode_session(payload)
+    assert check_plausibility(session, score, 3) == []
+    assert check_plausibility(session, score, 6) == []
+    assert check_plausibility(session, score, 2) == ["beans"]
+    assert check_plausibility(session, score, 7) == ["beans"]
+
+
+@pytest.mark.parametrize("frames", [1003, 1005])
+def test_bean_on_final_frame(frames):
+    payload, score, beans = play(frames, climb, beans={frames: 1})
+    session = decode_session(payload)
+    assert session["bean_frames"] == [frames]
+    assert check_plausibility(session, score, beans) == []
+
+
+def test_bean_before_first_sample():
+    payload, score, beans = play(20, climb, beans={3: 2})
+    assert check_plausibility(decode_session(payload), score, beans) == []
+
+
+def test_timed_round_with_pauses_counts_only_active_time():
+    # 60 с гри з кількома паузами: гра надсилає лише активний час (до кроку таймера понад 60 с)
+    payload, score, beans = play(3600, climb, mode="timed", duration_ms=60_250)
+    session = decode_session(payload)
+    assert session["mode"] == "timed"
+    assert check_plausibility(session, score, beans) == []
+
+
+def test_timed_round_longer_than_timer_is_flagged():
+    payload, score, beans = play(3600, climb, mode="timed", duration_ms=TIMED_MODE_MAX_MS + 1)
+    assert check_plausibility(decode_session(payload), score, beans) == ["duration"]
+
+
+def test_duration_limit_applies_only_to_timed_mode():
+    payload, score, beans = play(3600, climb, duration_ms=10 * 60_000)
+    assert check_plausibility(decode_session(payload), score, beans) == []
+
+
+# --- Неправдоподібні раунди ---
+
+def test_score_mismatch_is_flagged():
+    payload, score, beans = play(100, climb)
+    assert check_plausibility(decode_session(payload), score + 1, beans) == ["score"]
+
+
+def test_climb_faster_than_jump_is_flagged():
+    payload, score, beans = play(100, lambda frame: frame)
+    assert check_plausibility(decode_session(payload), score, beans) == ["climb"]
+
+
+def test_second_enemy_hit_is_flagged():
+    payload = encode("classic", 30, 500, [3, 6, 6], hit_frames=[20, 30])
+    assert check_plausibility(decode_session(payload), 6, 0) == ["hits"]
+
+
+# --- Пошкоджені пакети ---
+
+def test_every_truncation_is_rejected():
+    payload, _, _ = play(100, climb, beans={10: 1, 50: 2}, hit=True)
+    for length in range(len(payload)):
+        with pytest.raises(TelemetryError):
+            decode_session(payload[:length])
+
+
+def test_trailing_bytes_are_rejected():
+    payload, _, _ = play(100, climb)
+    with pytest.raises(TelemetryError, match="Зайві байти"):
+        decode_session(payload + b"\x00")
+
+
+@pytest.mark.parametrize("count", [10, 2 ** 20, 2 ** 35 - 1])
+def test_column_count_larger_than_payload_is_rejected(count):
+    out = bytearray(b"PT" + bytes([TELEMETRY_VERSION, 0]))
+    for value in (SAMPLE_FRAMES, 0, 0, count):
+        _varint(out, value)
+    with pytest.raises(TelemetryError, match="Довжина стовпця"):
+        decode_session(bytes(out) + b"\x01")
+
+
+def test_overlong_varint_is_rejected():
+    payload = b"PT" + bytes([TELEMETRY_VERSION, 0]) + b"\xff" * 8 + b"\x01"
+    with pytest.raises(TelemetryError, match="Завелике число"):
+        decode_session(payload)
+
+
+@pytest.mark.parametrize("payload, message", [
+    (b"XX\x01\x00\x0f\x00\x00\x01\x00\x00\x00", "Невідомий формат"),
+    (b"PT\x02\x00\x0f\x00\x00\x01\x00\x00\x00", "Непідтримувана версія"),
+    (b"PT\x01\x09\x0f\x00\x00\x01\x00\x00\x00", "Невідомий режим"),
+    (b"PT\x01\x00\x00\x00\x00\x01\x00\x00\x00", "Некоректний інтервал"),
+])
+def test_bad_header_is_rejected(payload, message):
+    with pytest.raises(TelemetryError, match=message):
+        decode_session(payload)
+
+
+def test_sample_count_must_match_frames():
+    payload = encode("classic", 30, 500, [3, 6])
+    with pytest.raises(TelemetryError, match="Кількість вибірок"):
+        decode_session(payload)
+
+
+def test_event_after_last_frame_is_rejected():
+    payload = encode("classic", 30, 500, [3, 6, 6], bean_frames=[31], bean_counts=[1])
+    with pytest.raises(TelemetryError, match="Подія після"):
+        decode_session(payload)